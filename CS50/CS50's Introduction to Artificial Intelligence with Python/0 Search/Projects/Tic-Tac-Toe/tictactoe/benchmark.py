@@ -0,0 +1,231 @@
+"""
+Benchmark and correctness check for the tic-tac-toe AI.
+
+Usage:
+    python benchmark.py           compare nodes searched and time per move
+    python benchmark.py verify    check minimax plays optimally everywhere,
+                                  serial and root-split
+    python benchmark.py mcts [games]    play mcts against minimax
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+import mcts
+import tictactoe as ttt
+
+# Nodes visited by the legacy search, counted the same way as ttt.stats.
+legacy_stats = {"nodes": 0}
+
+# Positions verify() also checks with the root-split search, which starts
+# a process pool for every move
+SPLIT_SAMPLE = 500
+
+
+def legacy_max_value(board, alpha=-math.inf, beta=math.inf):
+    """
+    max_value as it was before the negamax rewrite (arguments swapped).
+    """
+    legacy_stats["nodes"] += 1
+    if ttt.terminal(board):
+        return ttt.utility(board)
+
+    v = -math.inf
+
+    for a in ttt.actions(board):
+        v = max(v, legacy_min_value(ttt.result(board, a), math.inf, alpha))
+
+        alpha = max(alpha, v)
+
+        if (v > beta):
+            return v
+
+    return v
+
+
+def legacy_min_value(board, alpha=math.inf, beta=-math.inf):
+    """
+    min_value as it was before the negamax rewrite (arguments swapped).
+    """
+    legacy_stats["nodes"] += 1
+    if ttt.terminal(board):
+        return ttt.utility(board)
+
+    v = math.inf
+
+    for a in ttt.actions(board):
+        v = min(v, legacy_max_value(ttt.result(board, a), -math.inf, alpha))
+
+        alpha = min(alpha, v)
+
+        if (v < beta):
+            return v
+
+    return v
+
+
+def legacy_minimax(board):
+    """
+    minimax as it was before the negamax rewrite.
+    """
+    legacy_stats["nodes"] = 0
+
+    if ttt.player(board) == ttt.X:
+        best = (-math.inf, None)
+        for action in ttt.actions(board):
+            value = legacy_min_value(ttt.result(board, action))
+            if value >= best[0]:
+                best = (value, action)
+    else:
+        best = (math.inf, None)
+        for action in ttt.actions(board):
+            value = legacy_max_value(ttt.result(board, action))
+            if value <= best[0]:
+                best = (value, action)
+
+    return best[1]
+
+
+def key(board):
+    """
+    Returns a hashable copy of the board.
+    """
+    return tuple(tuple(row) for row in board)
+
+
+def reachable_states():
+    """
+    Returns every non terminal board reachable from the initial state.
+    """
+    seen = {}
+    stack = [ttt.initial_state()]
+
+    while stack:
+        board = stack.pop()
+        if key(board) in seen or ttt.terminal(board):
+            continue
+        seen[key(board)] = board
+        for action in ttt.actions(board):
+            stack.append(ttt.result(board, action))
+
+    return list(seen.values())
+
+
+def exact_value(board, memo):
+    """
+    Returns the game theoretic value of the board for X, by plain minimax
+    without any pruning.
+    """
+    k = key(board)
+    if k not in memo:
+        if ttt.terminal(board):
+            memo[k] = ttt.utility(board)
+        else:
+            values = [exact_value(ttt.result(board, a), memo) for a in ttt.actions(board)]
+            memo[k] = max(values) if ttt.player(board) == ttt.X else min(values)
+    return memo[k]
+
+
+def verify():
+    """
+    Checks that from every reachable position minimax picks a move that
+    keeps the game theoretic value of the position, and that the
+    root-split search does on the empty board and a fixed sample of
+    SPLIT_SAMPLE other positions.
+    """
+    memo = {}
+    states = reachable_states()
+    processes = max(2, os.cpu_count() or 1)
+    sample = [ttt.initial_state()] + random.Random(0).sample(states, SPLIT_SAMPLE)
+    failures = 0
+
+    for search, n, boards in [("minimax", 1, states), (f"split x{processes}", processes, sample)]:
+        for board in boards:
+            move = ttt.minimax(board, n)
+            if exact_value(ttt.result(board, move), memo) != exact_value(board, memo):
+                failures += 1
+                print(f"Suboptimal move {move} by {search} on {key(board)}")
+        print(f"{search}: checked {len(boards)} positions.")
+
+    print(f"{failures} suboptimal moves.")
+    return failures == 0
+
+
+def benchmark():
+    """
+    Compares nodes searched and time per move of the legacy search,
+    negamax and root-split negamax over the empty board and every opening
+    reply.
+    """
+    processes = max(2, os.cpu_count() or 1)
+    positions = [ttt.initial_state()]
+    positions += [ttt.result(ttt.initial_state(), a) for a in ttt.MOVE_ORDER]
+
+    totals = {"legacy": [0, 0.0], "negamax": [0, 0.0], f"split x{processes}": [0, 0.0]}
+    for board in positions:
+        start = time.perf_counter()
+        legacy_minimax(board)
+        totals["legacy"][0] += legacy_stats["nodes"]
+        totals["legacy"][1] += time.perf_counter() - start
+
+        ttt.minimax(board)
+        totals["negamax"][0] += ttt.stats["nodes"]
+        totals["negamax"][1] += ttt.stats["time"]
+
+        ttt.minimax(board, processes)
+        totals[f"split x{processes}"][0] += ttt.stats["nodes"]
+        totals[f"split x{processes}"][1] += ttt.stats["time"]
+
+    print(f"{'search':<12}{'nodes/move':>14}{'ms/move':>12}")
+    for name, (nodes, seconds) in totals.items():
+        print(f"{name:<12}{nodes / len(positions):>14.0f}{1000 * seconds / len(positions):>12.2f}")
+
+
+def duel(games):
+    """
+    Plays games of mcts against minimax, alternating who plays X, and
+    prints mcts results, time per move and rollouts per second.
+    """
+    outcomes = {"win": 0, "tie": 0, "loss": 0}
+    times = {"mcts": [], "minimax": []}
+    rollouts = 0
+
+    for game in range(games):
+        mcts_player = ttt.X if game % 2 == 0 else ttt.O
+        board = ttt.initial_state()
+
+        while not ttt.terminal(board):
+            if ttt.player(board) == mcts_player:
+                move = mcts.mcts(board, seed=game)
+                times["mcts"].append(mcts.stats["time"])
+                rollouts += mcts.stats["rollouts"]
+            else:
+                move = ttt.minimax(board)
+                times["minimax"].append(ttt.stats["time"])
+            board = ttt.result(board, move)
+
+        winner = ttt.winner(board)
+        if winner is None:
+            outcomes["tie"] += 1
+        elif winner == mcts_player:
+            outcomes["win"] += 1
+        else:
+            outcomes["loss"] += 1
+
+    print(f"mcts vs minimax over {games} games: {outcomes}")
+    for name, seconds in times.items():
+        print(f"{name:<10}{len(seconds) / sum(seconds):>10.1f} moves/s"
+              f"{1000 * sum(seconds) / len(seconds):>10.2f} ms/move")
+    print(f"mcts rollouts/s: {rollouts / sum(times['mcts']):.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "verify":
+        sys.exit(0 if verify() else 1)
+    if len(sys.argv) > 1 and sys.argv[1] == "mcts":
+        duel(int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+        sys.exit(0)
+    benchmark()
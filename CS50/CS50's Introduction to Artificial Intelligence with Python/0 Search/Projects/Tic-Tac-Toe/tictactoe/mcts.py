@@ -0,0 +1,159 @@
+"""
+Monte Carlo Tree Search (UCT) Tic Tac Toe Player
+"""
+
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+
+# Default number of rollouts per move, split between all processes
+ROLLOUTS = 2000
+
+# UCT exploration constant
+EXPLORATION = math.sqrt(2)
+
+# Search statistics of the most recent call to mcts.
+stats = {"rollouts": 0, "time": 0.0}
+
+
+class Node():
+    """
+    Node of the search tree: a board and the results of all rollouts that
+    passed through it.
+    """
+
+    def __init__(self, board, parent=None, action=None):
+        self.board = board
+        self.parent = parent
+        self.action = action
+        self.children = []
+        self.untried = [] if ttt.terminal(board) else ttt.ordered_actions(board)
+
+        # Player who made the move leading to this node
+        self.mover = None if parent is None else ttt.player(parent.board)
+
+        self.visits = 0
+
+        # Rollout score from the point of view of mover (win 1, tie 0.5)
+        self.score = 0.0
+
+    def select(self):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.score / child.visits
+            + EXPLORATION * math.sqrt(log_visits / child.visits)
+        )
+
+    def expand(self, rng):
+        """
+        Adds a child for a random untried action and returns it.
+        """
+        action = self.untried.pop(rng.randrange(len(self.untried)))
+        child = Node(ttt.result(self.board, action), self, action)
+        self.children.append(child)
+        return child
+
+    def update(self, winner):
+        """
+        Records the winner (None for a tie) of a rollout through this node.
+        """
+        self.visits += 1
+        if winner is None:
+            self.score += 0.5
+        elif winner == self.mover:
+            self.score += 1
+
+
+def rollout(board, rng):
+    """
+    Plays random moves from board until the game is over and returns the
+    winner, None for a tie.
+    """
+    board = [row[:] for row in board]
+    turn = ttt.player(board)
+
+    while not ttt.terminal(board):
+        i, j = rng.choice(ttt.ordered_actions(board))
+        board[i][j] = turn
+        turn = ttt.O if turn == ttt.X else ttt.X
+
+    return ttt.winner(board)
+
+
+def search(board, rollouts=None, time_budget=None, seed=None):
+    """
+    Builds a UCT tree from board until rollouts rollouts were played or
+    time_budget seconds passed, whichever comes first.
+    Returns a dict mapping each root action to its visit count, and the
+    number of rollouts played.
+    """
+    rng = random.Random(seed)
+    root = Node(board)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    count = 0
+
+    while ((rollouts is None or count < rollouts)
+           and (deadline is None or time.perf_counter() < deadline)):
+        node = root
+
+        # Selection
+        while not node.untried and node.children:
+            node = node.select()
+
+        # Expansion
+        if node.untried:
+            node = node.expand(rng)
+
+        # Simulation and backpropagation
+        winner = rollout(node.board, rng)
+        while node is not None:
+            node.update(winner)
+            node = node.parent
+
+        count += 1
+
+    return {child.action: child.visits for child in root.children}, count
+
+
+def mcts(board, rollouts=ROLLOUTS, time_budget=None, processes=None, seed=None):
+    """
+    Returns the most visited action for the current player on the board.
+    The rollouts (or the time budget) are split across processes
+    independent trees (root parallelisation) whose root visit counts are
+    merged. Pass rollouts=None to search for time_budget seconds only.
+    """
+    if ttt.terminal(board):
+        return None
+
+    if rollouts is None and time_budget is None:
+        raise ValueError("rollouts or time_budget must be given")
+
+    start = time.perf_counter()
+    processes = processes or os.cpu_count() or 1
+    batch = None if rollouts is None else math.ceil(rollouts / processes)
+    seeds = [None if seed is None else seed + k for k in range(processes)]
+
+    if processes == 1:
+        results = [search(board, batch, time_budget, seeds[0])]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [pool.submit(search, board, batch, time_budget, s) for s in seeds]
+            results = [future.result() for future in futures]
+
+    visits = Counter()
+    for counts, _ in results:
+        visits.update(counts)
+
+    stats["rollouts"] = sum(count for _, count in results)
+    stats["time"] = time.perf_counter() - start
+
+    return max(visits, key=visits.get)
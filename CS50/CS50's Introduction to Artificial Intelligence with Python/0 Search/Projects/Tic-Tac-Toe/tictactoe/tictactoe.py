@@ -4,6 +4,10 @@ Tic Tac Toe Player
 
 import math
 import copy
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 X = "X"
 O = "O"
@@ -144,73 +148,163 @@ def utility(board):
         return 0
 
 
-def max_value(board, alpha=-math.inf, beta=math.inf):
+# Order in which moves are tried: centre first, then corners, then edges.
+# Strong moves searched early make alpha-beta cut off far more of the tree.
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Search statistics of the most recent call to minimax.
+stats = {"nodes": 0, "time": 0.0}
+
+# Best root value found so far, shared between the processes of a
+# parallel minimax search.
+shared_alpha = None
+
+
+def ordered_actions(board):
+    """
+    Returns list of all possible actions (i, j), most promising first.
+    """
+    return [(i, j) for i, j in MOVE_ORDER if board[i][j] == EMPTY]
+
+
+def negamax(board, turn, alpha=-math.inf, beta=math.inf):
     """
-    "X / The maximizing player". Returns the max value of all possible actions (utility(action)).
-    Alpha and beta parameters for alpha-beta pruning.
+    Returns the value of the board from the point of view of the player
+    whose turn it is (1 win, 0 tie, -1 loss).
+    Alpha and beta bound the window of values still of interest: as soon
+    as a move scores beta or more the opponent will never allow this
+    position, so the remaining moves are pruned.
+    Moves are made and undone on the board in place.
     """
+    stats["nodes"] += 1
+
     if terminal(board):
-        return utility(board)
-    
+        return utility(board) if turn == X else -utility(board)
+
+    opponent = O if turn == X else X
     v = -math.inf
 
-    for a in actions(board):
-        v = max(v, min_value(result(board, a), math.inf, alpha))
-        
+    for i, j in ordered_actions(board):
+        board[i][j] = turn
+        v = max(v, -negamax(board, opponent, -beta, -alpha))
+        board[i][j] = EMPTY
+
         alpha = max(alpha, v)
 
-        if (v > beta):
-            return v
+        if alpha >= beta:
+            break
 
     return v
 
 
-def min_value(board, alpha=math.inf, beta=-math.inf):
+def serial_root(board):
     """
-    "O / The minimizing player". Returns the min value of all possible actions (utility(action)).
-    Alpha and beta parameters for alpha-beta pruning.
+    Returns the optimal action, searching the root actions one by one.
     """
-    if terminal(board):
-        return utility(board)
-    
-    v = math.inf
+    ai = player(board)
+    opponent = O if ai == X else X
 
-    for a in actions(board):
-        v = min(v, max_value(result(board, a), -math.inf, alpha))
+    best = (-math.inf, None)
+    for i, j in ordered_actions(board):
+        board[i][j] = ai
+        value = -negamax(board, opponent, -math.inf, -best[0])
+        board[i][j] = EMPTY
 
-        alpha = min(alpha, v)
+        if value > best[0]:
+            best = (value, (i, j))
 
-        if (v < beta):
-            return v
+    return best[1]
 
-    return v
+
+def init_root_worker(alpha):
+    """
+    Process pool initializer: stores the shared alpha slot.
+    """
+    global shared_alpha
+    shared_alpha = alpha
+
+
+def search_root_action(board, action):
+    """
+    Worker task of parallel minimax. Returns the value of action for the
+    player to move, whether that value is exact or only an upper bound,
+    and the number of nodes searched.
+    The search window starts at the best root value found so far by any
+    process, and an exact value better than it is published back.
+    """
+    stats["nodes"] = 0
+
+    ai = player(board)
+    opponent = O if ai == X else X
+    alpha = shared_alpha.value
+
+    i, j = action
+    board[i][j] = ai
+    value = -negamax(board, opponent, -math.inf, -alpha)
+
+    # Otherwise the opponent refuted the move and value is an upper bound
+    exact = value > alpha
+    if exact:
+        with shared_alpha.get_lock():
+            if value > shared_alpha.value:
+                shared_alpha.value = value
+
+    return value, exact, stats["nodes"]
 
 
-def minimax(board):
+def parallel_root(board, processes):
+    """
+    Returns the optimal action, splitting the root actions between
+    processes. The most promising action is searched first on its own
+    (young brothers wait) so the others start with a useful alpha bound.
+    """
+    ai = player(board)
+    opponent = O if ai == X else X
+    moves = ordered_actions(board)
+
+    i, j = moves[0]
+    board[i][j] = ai
+    best = (-negamax(board, opponent), moves[0])
+    board[i][j] = EMPTY
+
+    if len(moves) == 1:
+        return best[1]
+
+    alpha = multiprocessing.Value("d", best[0])
+    with ProcessPoolExecutor(processes, initializer=init_root_worker, initargs=(alpha,)) as pool:
+        results = pool.map(search_root_action, [board] * (len(moves) - 1), moves[1:])
+
+        for action, (value, exact, nodes) in zip(moves[1:], results):
+            stats["nodes"] += nodes
+            if exact and value > best[0]:
+                best = (value, action)
+
+    return best[1]
+
+
+def minimax(board, processes=1):
     """
     Returns the optimal action for the current player on the board.
+    With more than one process (None for all CPU cores) the root actions
+    are searched in parallel.
     """
     if terminal(board):
         return None
 
-    ai = player(board)
-    
-    if ai == "X":
-        max = (-math.inf, None)
-        for action in actions(board):
-            value = min_value(result(board, action))
-
-            if value >= max[0]:
-                max = (value, action)
-        
-        return max[1]
-    elif ai == "O":
-        min = (math.inf, None)
-        for action in actions(board):
-            value = max_value(result(board, action))
-
-            if value <= min[0]:
-                min = (value, action)
-
-        return min[1]
+    stats["nodes"] = 0
+    start = time.perf_counter()
+
+    board = copy.deepcopy(board)
+    processes = processes or os.cpu_count() or 1
+
+    if processes > 1:
+        action = parallel_root(board, processes)
+    else:
+        action = serial_root(board)
+
+    stats["time"] = time.perf_counter() - start
+
+    return action
 
@@ -0,0 +1,119 @@
+"""
+Background AI search for the tic-tac-toe runner
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+
+import tictactoe as ttt
+
+
+def search(conn, algorithm, board):
+    """
+    Runs algorithm on board and sends the chosen action back through conn.
+    The search runs in a process group of its own, so cancelling it can
+    stop any processes the algorithm starts as well.
+    """
+    if hasattr(os, "setpgid"):
+        os.setpgid(0, 0)
+    conn.send(algorithm(board))
+    conn.close()
+
+
+class AIWorker():
+    """
+    Computes AI moves in a separate process, so the caller can keep
+    drawing frames and handling events while the search runs.
+    """
+
+    def __init__(self, algorithm=ttt.minimax):
+        """
+        algorithm is a module level function taking a board and returning
+        an action, e.g. ttt.minimax. The search process is not a daemon, so
+        the algorithm may start processes of its own.
+        """
+        self.algorithm = algorithm
+        self.process = None
+        self.conn = None
+        self.started = None
+
+        # Seconds between the last start() and the result being picked up.
+        self.latency = None
+
+        # Why the last search failed, None unless it did.
+        self.error = None
+
+    def busy(self):
+        """
+        Returns True while a search is running or its result is unread.
+        """
+        return self.process is not None
+
+    def start(self, board):
+        """
+        Starts searching for the best action on board.
+        """
+        self.cancel()
+        self.conn, child_conn = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(
+            target=search, args=(child_conn, self.algorithm, board)
+        )
+        self.started = time.perf_counter()
+        self.process.start()
+        child_conn.close()
+
+        # Also set the group from this side, so it exists before start()
+        # returns even if the search has not run yet
+        if hasattr(os, "setpgid"):
+            try:
+                os.setpgid(self.process.pid, self.process.pid)
+            except OSError:
+                pass
+
+    def poll(self):
+        """
+        Returns the action once the search is done, None while it is still
+        thinking, if no search was started or if the search failed, in
+        which case error says why.
+        """
+        if self.process is None or not self.conn.poll():
+            return None
+
+        # EOFError: the search process died without sending an action
+        try:
+            action = self.conn.recv()
+            failed = False
+        except EOFError:
+            action = None
+            failed = True
+        self.latency = time.perf_counter() - self.started
+        self.process.join()
+        if failed:
+            self.error = f"search process exited with code {self.process.exitcode}"
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+        return action
+
+    def cancel(self):
+        """
+        Stops the running search and any processes it started, if any, and
+        discards its result.
+        """
+        self.error = None
+        if self.process is None:
+            return
+
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
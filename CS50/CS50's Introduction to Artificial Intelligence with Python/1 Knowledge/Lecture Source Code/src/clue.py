@@ -23,10 +23,11 @@ symbols = characters + rooms + weapons
 
 
 def check_knowledge(knowledge):
+    answers = model_check_many(knowledge, symbols)
     for symbol in symbols:
-        if model_check(knowledge, symbol):
+        if answers[symbol] == ENTAILED:
             termcolor.cprint(f"{symbol}: YES", "green")
-        elif not model_check(knowledge, Not(symbol)):
+        elif answers[symbol] == UNKNOWN:
             print(f"{symbol}: MAYBE")
 
 
@@ -1,8 +1,53 @@
+import contextlib
 import itertools
+import math
+import multiprocessing
+import os
+import heapq
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class Sentence():
 
+    # Immutable sentences by class and parts, so that building a sentence
+    # equal to an existing one returns the existing node
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, key, sentence):
+        """Records sentence as the interned sentence for key, a tuple of its
+        class and parts, unless a part may still change."""
+        if not any(isinstance(part, Sentence) and Sentence.mutable(part) for part in key[1:]):
+            Sentence.interned[key] = sentence
+
+    @classmethod
+    def mutable(cls, sentence):
+        """Checks if sentence may still change: if it is an And, which add()
+        extends in place, or contains one."""
+        return isinstance(sentence, And) or bool(sentence._mutable)
+
+    def set_parts(self, parts):
+        """Records the symbols of a new sentence with the given parts, and
+        which of them may still change."""
+        self._mutable = [part for part in parts if Sentence.mutable(part)]
+        self._symbols = frozenset().union(*[part.symbols() for part in parts])
+        self._symbols_version = self.parts_version()
+
+    def parts_version(self):
+        """Returns the versions of the parts that may still change."""
+        return tuple(part.version() for part in self._mutable)
+
+    def version(self):
+        """Returns a value that changes whenever the sentence does, i.e.
+        whenever an And in it is extended; None if it cannot change."""
+        return self.parts_version() if self._mutable else None
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -12,8 +57,38 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        if self._mutable:
+            version = self.parts_version()
+            if version != self._symbols_version:
+                self._symbols = frozenset().union(*[part.symbols() for part in self.parts()])
+                self._symbols_version = version
+        return self._symbols
+
+    def parts(self):
+        """Returns the sentences this sentence is built from."""
+        return []
+
+    def partial_code(self, index, value):
+        """Returns a Python expression that is true if the sentence has the
+        truth value value in every completion of a partial model, given as
+        int masks t and f of the symbols assigned true and false (Kleene's
+        three-valued logic)."""
+        raise Exception("nothing to compile")
+
+    def cache(self):
+        """Returns a dict of values derived from the sentence, such as its
+        compiled form; it is emptied whenever the sentence changes,
+        including when an And inside it is extended."""
+        version = self.version()
+        try:
+            if self._cache_version == version:
+                return self._cache
+        except AttributeError:
+            pass
+        self._cache = {}
+        self._cache_version = version
+        return self._cache
 
     @classmethod
     def validate(cls, sentence):
@@ -44,68 +119,109 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        key = (cls, name)
+        self = Sentence.interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.name = name
+            self._hash = hash(("symbol", name))
+            self._symbols = frozenset([name])
+            self._mutable = []
+            Sentence.intern(key, self)
+        return self
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (isinstance(other, Symbol) and self.name == other.name)
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
 
+    def __reduce__(self):
+        return (Symbol, (self.name,))
+
     def evaluate(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
-            raise EvaluationException(f"variable {self.name} not in model")
+            raise Exception(f"variable {self.name} not in model")
 
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def partial_code(self, index, value):
+        return f"({'t' if value else 'f'} & {1 << index[self.name]})"
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        key = (cls, operand)
+        self = Sentence.interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.operand = operand
+            self.set_parts([operand])
+            self._hash = None
+            if not self._mutable:
+                self._hash = hash(("not", hash(operand)))
+            Sentence.intern(key, self)
+        return self
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (isinstance(other, Not) and self.operand == other.operand)
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        if self._hash is None:
+            return hash(("not", hash(self.operand)))
+        return self._hash
+
+    def parts(self):
+        return [self.operand]
 
     def __repr__(self):
         return f"Not({self.operand})"
 
+    def __reduce__(self):
+        return (Not, (self.operand,))
+
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def partial_code(self, index, value):
+        return self.operand.partial_code(index, not value)
 
 
 class And(Sentence):
+    """Conjunction. Unlike the other sentences it is not interned, because
+    add() extends it in place: it is the builder for knowledge bases.
+    Every add() bumps its version, and what is derived from a sentence
+    (its symbols and cache) is recomputed once the version of an And
+    inside it changed."""
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._version = 0
+        self._hash = None
+        self.set_parts(self.conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (isinstance(other, And) and self.conjuncts == other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None or self._mutable:
+            self._hash = hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,9 +229,32 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
+
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        bdd = self.cache().get("bdd")
+        symbols = self.symbols()
+
         self.conjuncts.append(conjunct)
+        self._version += 1
+        self._hash = None
+        if Sentence.mutable(conjunct):
+            self._mutable.append(conjunct)
+        self._symbols = symbols | conjunct.symbols()
+        self._symbols_version = self.parts_version()
+
+        # A compiled decision diagram is extended rather than rebuilt
+        if bdd is not None:
+            bdd.root = bdd.apply("and", bdd.root, bdd.compile(conjunct))
+            self.cache()["bdd"] = bdd
+
+    def parts(self):
+        return self.conjuncts
+
+    def version(self):
+        return (self._version, self.parts_version())
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,28 +265,47 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def partial_code(self, index, value):
+        if not self.conjuncts:
+            return str(value)
+        parts = [conjunct.partial_code(index, value) for conjunct in self.conjuncts]
+        return "(" + (" and " if value else " or ").join(parts) + ")"
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        key = (cls, *disjuncts)
+        self = Sentence.interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.disjuncts = list(disjuncts)
+            self.set_parts(self.disjuncts)
+            self._hash = None
+            if not self._mutable:
+                self._hash = hash(("or", tuple(hash(disjunct) for disjunct in disjuncts)))
+            Sentence.intern(key, self)
+        return self
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (isinstance(other, Or) and self.disjuncts == other.disjuncts)
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        if self._hash is None:
+            return hash(("or", tuple(hash(disjunct) for disjunct in self.disjuncts)))
+        return self._hash
+
+    def parts(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def __reduce__(self):
+        return (Or, tuple(self.disjuncts))
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
@@ -157,28 +315,49 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def partial_code(self, index, value):
+        if not self.disjuncts:
+            return str(not value)
+        parts = [disjunct.partial_code(index, value) for disjunct in self.disjuncts]
+        return "(" + (" or " if value else " and ").join(parts) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        key = (cls, antecedent, consequent)
+        self = Sentence.interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.antecedent = antecedent
+            self.consequent = consequent
+            self.set_parts([antecedent, consequent])
+            self._hash = None
+            if not self._mutable:
+                self._hash = hash(("implies", hash(antecedent), hash(consequent)))
+            Sentence.intern(key, self)
+        return self
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        if self._hash is None:
+            return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self._hash
+
+    def parts(self):
+        return [self.antecedent, self.consequent]
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
+
     def evaluate(self, model):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
@@ -188,28 +367,48 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def partial_code(self, index, value):
+        antecedent = self.antecedent.partial_code(index, not value)
+        consequent = self.consequent.partial_code(index, value)
+        return f"({antecedent} {'or' if value else 'and'} {consequent})"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        key = (cls, left, right)
+        self = Sentence.interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.left = left
+            self.right = right
+            self.set_parts([left, right])
+            self._hash = None
+            if not self._mutable:
+                self._hash = hash(("biconditional", hash(left), hash(right)))
+            Sentence.intern(key, self)
+        return self
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        if self._hash is None:
+            return hash(("biconditional", hash(self.left), hash(self.right)))
+        return self._hash
+
+    def parts(self):
+        return [self.left, self.right]
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
+
     def evaluate(self, model):
         return ((self.left.evaluate(model)
                  and self.right.evaluate(model))
@@ -221,43 +420,1450 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def partial_code(self, index, value):
+        left_true = self.left.partial_code(index, True)
+        left_false = self.left.partial_code(index, False)
+        right_true = self.right.partial_code(index, value)
+        right_false = self.right.partial_code(index, not value)
+        return f"(({left_true} and {right_true}) or ({left_false} and {right_false}))"
+
+
+def partial_value(sentence, t, f, index):
+    """Returns the Kleene truth value of sentence in the partial model
+    given by masks t and f: True, False, or None if not yet determined."""
+    if isinstance(sentence, Symbol):
+        bit = 1 << index[sentence.name]
+        return True if t & bit else False if f & bit else None
+    if isinstance(sentence, Not):
+        value = partial_value(sentence.operand, t, f, index)
+        return None if value is None else not value
+    if isinstance(sentence, (And, Or)):
+        parts = sentence.conjuncts if isinstance(sentence, And) else sentence.disjuncts
+        decisive = isinstance(sentence, Or)
+        values = [partial_value(part, t, f, index) for part in parts]
+        if decisive in values:
+            return decisive
+        return None if None in values else not decisive
+    if isinstance(sentence, Implication):
+        return partial_value(Or(Not(sentence.antecedent), sentence.consequent), t, f, index)
+    if isinstance(sentence, Biconditional):
+        left = partial_value(sentence.left, t, f, index)
+        right = partial_value(sentence.right, t, f, index)
+        return None if left is None or right is None else left == right
+    raise TypeError("must be a logical sentence")
+
+
+def compile_partial(sentence, symbols, value):
+    """Returns a function of masks t and f, the symbols (by position in
+    symbols) assigned true and false, that checks if sentence has the
+    truth value value whatever the unassigned symbols are. The function
+    is generated Python code, cached on the sentence."""
+    index = {name: k for k, name in enumerate(symbols)}
+    key = ("partial", value, tuple(sorted((name, index[name]) for name in sentence.symbols())))
+    cache = sentence.cache()
+    if key not in cache:
+        try:
+            source = f"lambda t, f: bool({sentence.partial_code(index, value)})"
+            cache[key] = eval(compile(source, "<sentence>", "eval"))
+        except (RecursionError, SyntaxError, MemoryError):
+            # Too deeply nested for the Python compiler
+            def evaluate(t, f):
+                return partial_value(sentence, t, f, index) is value
+            cache[key] = evaluate
+    return cache[key]
+
+
+# Counters recorded inside profiling(), None when profiling is off
+profile = None
+
+
+@contextlib.contextmanager
+def profiling():
+    """Records, inside the with block, the models visited and branches
+    pruned by the in-process enumeration backends, evaluate calls per
+    sentence type (made by the reference backend), calls of compiled
+    sentence functions, the decisions, propagations, conflicts and
+    learned clauses of the SAT solver and apply steps of decision
+    diagrams. Yields the counters. Functions and methods are only
+    wrapped while profiling, so profiling costs nothing when it is off."""
+    global profile, compile_partial
+    if profile is not None:
+        raise RuntimeError("already profiling")
+
+    profile = {"models": 0, "pruned": 0, "evaluate": {}, "compiled": 0,
+               "sat": {}, "bdd_apply": 0}
+    counters = profile
+
+    def counted(evaluate, name):
+        def wrapper(self, model):
+            counters["evaluate"][name] = counters["evaluate"].get(name, 0) + 1
+            return evaluate(self, model)
+        return wrapper
+
+    def compiled(compile_function):
+        def wrapper(*args):
+            function = compile_function(*args)
+
+            def counted_function(*model):
+                counters["compiled"] += 1
+                return function(*model)
+            return counted_function
+        return wrapper
+
+    def solving(solve):
+        def wrapper(self, assumptions=()):
+            before = dict(self.stats)
+            try:
+                return solve(self, assumptions)
+            finally:
+                for key, value in self.stats.items():
+                    counters["sat"][key] = counters["sat"].get(key, 0) + value - before[key]
+        return wrapper
+
+    classes = [Symbol, Not, And, Or, Implication, Biconditional]
+    originals = {cls: cls.__dict__["evaluate"] for cls in classes}
+    compile_function = compile_partial
+    solve = Solver.solve
+    for cls in classes:
+        cls.evaluate = counted(originals[cls], cls.__name__)
+    compile_partial = compiled(compile_function)
+    Solver.solve = solving(solve)
+    try:
+        yield counters
+    finally:
+        for cls in classes:
+            cls.evaluate = originals[cls]
+        compile_partial = compile_function
+        Solver.solve = solve
+        profile = None
+
+
+def record_models(models, pruned=0):
+    """Adds to the profile, if profiling, models visited and pruned."""
+    if profile is not None:
+        profile["models"] += models
+        profile["pruned"] += pruned
+
+
+def record_applies(steps):
+    """Adds to the profile, if profiling, apply steps of decision diagrams."""
+    if profile is not None:
+        profile["bdd_apply"] += steps
+
+
+def symbol_counts(sentence, counts):
+    """Adds the number of occurrences of each symbol in sentence to counts."""
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    elif isinstance(sentence, Not):
+        symbol_counts(sentence.operand, counts)
+    elif isinstance(sentence, And):
+        for conjunct in sentence.conjuncts:
+            symbol_counts(conjunct, counts)
+    elif isinstance(sentence, Or):
+        for disjunct in sentence.disjuncts:
+            symbol_counts(disjunct, counts)
+    elif isinstance(sentence, Implication):
+        symbol_counts(sentence.antecedent, counts)
+        symbol_counts(sentence.consequent, counts)
+    elif isinstance(sentence, Biconditional):
+        symbol_counts(sentence.left, counts)
+        symbol_counts(sentence.right, counts)
+    return counts
+
+
+def enumeration_order(knowledge, query):
+    """Returns the symbols of knowledge and query, most frequent first."""
+    counts = symbol_counts(query, symbol_counts(knowledge, {}))
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+def check_completions(knowledge, query, symbols, t=0, f=0, cancelled=None):
+    """Checks if knowledge base entails query in every completion of the
+    partial model where the first symbols are assigned by masks t and f
+    (every symbol below the highest assigned one must be assigned).
+    Symbols are assigned one at a time and the knowledge base and query
+    are evaluated in three-valued logic after every assignment: a branch
+    is cut off as soon as the knowledge base is false, or it is true and
+    so is the query. cancelled, if given, is polled now and then and
+    stops the search (returning True) once it returns True."""
+    knowledge_true = compile_partial(knowledge, symbols, True)
+    knowledge_false = compile_partial(knowledge, symbols, False)
+    query_true = compile_partial(query, symbols, True)
+    query_false = compile_partial(query, symbols, False)
+
+    # Bits assigned so far in order, to undo them when backtracking
+    start = (t | f).bit_length()
+    trail = []
+    visited = 0
+    pruned = 0
+
+    while True:
+        visited += 1
+        if cancelled is not None and visited % 1024 == 0 and cancelled():
+            record_models(visited, pruned)
+            return True
+
+        if not knowledge_false(t, f):
+            if knowledge_true(t, f):
+                if query_false(t, f):
+                    record_models(visited, pruned)
+                    return False
+                branch = not query_true(t, f)
+            else:
+                branch = True
+
+            # Try the next symbol true first
+            if branch:
+                bit = 1 << (start + len(trail))
+                t |= bit
+                trail.append(bit)
+                continue
+
+        if start + len(trail) < len(symbols):
+            pruned += 1
+
+        # Backtrack to the last symbol still to be tried false
+        while trail:
+            bit = trail[-1]
+            if t & bit:
+                t &= ~bit
+                f |= bit
+                break
+            f &= ~bit
+            trail.pop()
+        else:
+            record_models(visited, pruned)
+            return True
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check_enumerate(knowledge, query):
+    """Checks if knowledge base entails query by enumerating models, most
+    frequent symbols first, pruning with three-valued evaluation."""
+    return check_completions(knowledge, query, enumeration_order(knowledge, query))
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+def check_all(knowledge, query, symbols, model):
+    """Checks if knowledge base entails query, given a particular model."""
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+    # If model has an assignment for each symbol
+    if not symbols:
+        record_models(1)
+
+        # If knowledge base is true in model, then query must also be true
+        if knowledge.evaluate(model):
+            return query.evaluate(model)
+        return True
+    else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+        # Choose one of the remaining unused symbols
+        remaining = symbols.copy()
+        p = remaining.pop()
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+        # Create a model where the symbol is true
+        model_true = model.copy()
+        model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+        # Create a model where the symbol is false
+        model_false = model.copy()
+        model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        # Ensure entailment holds in both models
+        return (check_all(knowledge, query, remaining, model_true) and
+                check_all(knowledge, query, remaining, model_false))
+
+
+def model_check_reference(knowledge, query):
+    """Checks if knowledge base entails query with the original enumerator,
+    which evaluates the sentence trees in every model. It is slow, and
+    kept to cross-check the other backends."""
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set.union(set(knowledge.symbols()), query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+# Knowledge base, query, symbol order and cancel event of an enumeration
+# worker process
+enumeration = {}
+
+
+def init_enumeration_worker(knowledge, query, symbols, cancel):
+    """Process pool initializer: receives the problem once per worker."""
+    enumeration.update(knowledge=knowledge, query=query, symbols=symbols, cancel=cancel)
+
+
+def check_prefix(prefix, split):
+    """Worker task: checks entailment in the sub-problem where symbol k,
+    for k below split, is assigned bit k of prefix."""
+    t = prefix
+    f = ~prefix & ((1 << split) - 1)
+
+    entailed = check_completions(enumeration["knowledge"], enumeration["query"],
+                                 enumeration["symbols"], t, f, enumeration["cancel"].is_set)
+    if not entailed:
+        enumeration["cancel"].set()
+    return entailed
+
+
+def model_check_parallel(knowledge, query, processes=None, split=None):
+    """Checks if knowledge base entails query by splitting the models on
+    the first split symbols into 2 ** split sub-problems, enumerated in
+    a pool of processes. All workers stop as soon as one of them finds a
+    model where the knowledge base holds and the query does not."""
+    symbols = enumeration_order(knowledge, query)
+    processes = processes or os.cpu_count() or 1
+    if split is None:
+        split = math.ceil(math.log2(processes)) + 3
+    split = min(split, len(symbols))
+
+    cancel = multiprocessing.Event()
+    with ProcessPoolExecutor(processes, initializer=init_enumeration_worker,
+                             initargs=(knowledge, query, symbols, cancel)) as pool:
+        pending = {pool.submit(check_prefix, prefix, split) for prefix in range(2 ** split)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if not all(future.result() for future in done):
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+                return False
+    return True
+
+
+class CNF():
+    """Clauses over integer literals, built from sentences by the Tseitin
+    transformation. Variable v is true in literal v and false in -v."""
+
+    def __init__(self):
+        self.variables = {}
+        self.names = {}
+        self.definitions = {}
+        self.clauses = []
+        self.count = 0
+
+    def new_variable(self):
+        """Returns a fresh variable."""
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable of a symbol name."""
+        if name not in self.variables:
+            variable = self.new_variable()
+            self.variables[name] = variable
+            self.names[variable] = name
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, adding the clauses that
+        define it. Every new variable is fully defined by its subformula, so
+        each model of the symbols extends to exactly one model of the CNF."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        # A sentence that may still change is defined anew every time
+        mutable = Sentence.mutable(sentence)
+        if not mutable and sentence in self.definitions:
+            return self.definitions[sentence]
+
+        x = self.new_variable()
+        if isinstance(sentence, And):
+            literals = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            for literal in literals:
+                self.clauses.append([-x, literal])
+            self.clauses.append([x] + [-literal for literal in literals])
+        elif isinstance(sentence, Or):
+            literals = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            for literal in literals:
+                self.clauses.append([x, -literal])
+            self.clauses.append([-x] + literals)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            self.clauses.extend([[x, a], [x, -b], [-x, -a, b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.clauses.extend([[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        if not mutable:
+            self.definitions[sentence] = x
+        return x
+
+    def add(self, sentence):
+        """Asserts that sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """CDCL SAT solver: unit propagation with two watched literals, first
+    UIP clause learning, non-chronological backjumping, activity based
+    branching with phase saving and restarts."""
+
+    def __init__(self, clauses=(), count=0):
+        self.count = 0
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [-1]
+        self.watches = {}
+        self.units = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.increment = 1.0
+        self.ok = True
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0, "learned": 0}
+        self.reserve(count)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def reserve(self, count):
+        """Makes room for variables up to count."""
+        while self.count < count:
+            self.count += 1
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(-1)
+            self.watches[self.count] = []
+            self.watches[-self.count] = []
+
+    def literal_value(self, literal):
+        """Returns 1 if literal is true, -1 if false, 0 if unassigned."""
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause):
+        """Adds a clause; may be called between calls to solve."""
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return
+        self.reserve(max((abs(literal) for literal in clause), default=0))
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.units.append(clause[0])
+        else:
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+
+    def enqueue(self, literal, reason):
+        """Makes literal true at the current decision level."""
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Propagates all enqueued literals; returns a conflicting clause or
+        None."""
+        value = self.value
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            self.stats["propagations"] += 1
+            watching = self.watches[false_literal]
+            self.watches[false_literal] = kept = []
+            for n, clause in enumerate(watching):
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                if (value[first] if first > 0 else -value[-first]) == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if (value[other] if other > 0 else -value[-other]) != -1:
+                        clause[1], clause[k] = other, false_literal
+                        self.watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if (value[first] if first > 0 else -value[-first]) == -1:
+                        kept.extend(watching[n + 1:])
+                        self.qhead = len(self.trail)
+                        return clause
+                    self.enqueue(first, clause)
+        return None
+
+    def analyze(self, conflict):
+        """Returns the first UIP clause learned from conflict, asserting
+        literal first, and the level to backjump to."""
+        current = len(self.trail_lim)
+        learned = [None]
+        seen = set()
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                variable = abs(q)
+                if variable not in seen and self.level[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.level[variable] == current:
+                        counter += 1
+                    else:
+                        learned.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reason[abs(literal)]
+
+        learned[0] = -literal
+        level = 0
+        if len(learned) > 1:
+            k = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+            learned[1], learned[k] = learned[k], learned[1]
+            level = self.level[abs(learned[1])]
+        return learned, level
+
+    def bump(self, variable):
+        """Raises the branching activity of variable."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """Undoes all assignments above decision level, or all assignments
+        if level is -1."""
+        if len(self.trail_lim) <= level:
+            return
+        start = 0 if level < 0 else self.trail_lim[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = self.value[variable]
+            self.value[variable] = 0
+            self.reason[variable] = None
+        del self.trail[start:]
+        del self.trail_lim[max(level, 0):]
+        self.qhead = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity, as a
+        literal in its saved phase, or None if all are assigned."""
+        best = None
+        for variable in range(1, self.count + 1):
+            if self.value[variable] == 0 and (
+                best is None or self.activity[variable] > self.activity[best]
+            ):
+                best = variable
+        if best is None:
+            return None
+        return best if self.phase[best] == 1 else -best
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses and assumption literals are
+        satisfiable; the model is then available from model()."""
+        self.backtrack(-1)
+        if not self.ok:
+            return False
+        for literal in self.units:
+            value = self.literal_value(literal)
+            if value == -1:
+                self.ok = False
+                return False
+            if value == 0:
+                self.enqueue(literal, None)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        self.reserve(max((abs(literal) for literal in assumptions), default=0))
+
+        restart = 100
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                self.increment *= 1.05
+                if len(learned) == 1:
+                    self.units.append(learned[0])
+                    self.enqueue(learned[0], None)
+                else:
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                    self.stats["learned"] += 1
+                    self.enqueue(learned[0], learned)
+                continue
+
+            if conflicts >= restart:
+                conflicts = 0
+                restart = int(restart * 1.5)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are the first decisions
+            literal = None
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                value = self.literal_value(assumption)
+                if value == -1:
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value == 0:
+                    literal = assumption
+                    break
+            if literal is None:
+                literal = self.decide()
+                if literal is None:
+                    return True
+                self.trail_lim.append(len(self.trail))
+            self.stats["decisions"] += 1
+            self.enqueue(literal, None)
+
+    def model(self):
+        """Returns the last satisfying assignment as variable -> bool."""
+        return {variable: self.value[variable] == 1
+                for variable in range(1, self.count + 1)}
+
+
+class Prover():
+    """SAT solver loaded with one knowledge base, which answers queries by
+    solving under assumptions so clauses learned for one query help the
+    next."""
+
+    def __init__(self, knowledge):
+        self.cnf = CNF()
+        self.cnf.add(knowledge)
+        self.solver = Solver(self.cnf.clauses, self.cnf.count)
+        self.loaded = len(self.cnf.clauses)
+
+    @classmethod
+    def of(cls, knowledge):
+        """Returns the prover of knowledge, cached on the sentence."""
+        cache = knowledge.cache()
+        if "prover" not in cache:
+            cache["prover"] = cls(knowledge)
+        return cache["prover"]
+
+    def literal(self, sentence):
+        """Returns the literal of sentence, loading its definition."""
+        literal = self.cnf.literal(sentence)
+        for clause in self.cnf.clauses[self.loaded:]:
+            self.solver.add_clause(clause)
+        self.loaded = len(self.cnf.clauses)
+        self.solver.reserve(self.cnf.count)
+        return literal
+
+    def satisfiable(self, *literals):
+        """Checks if the knowledge base is satisfiable with literals true."""
+        return self.solver.solve(literals)
+
+    def value(self, literal):
+        """Returns the value of literal in the last model found."""
+        return self.solver.literal_value(literal) == 1
+
+
+def model_check_sat(knowledge, query):
+    """Checks if knowledge base entails query, i.e. if knowledge and not
+    query together are unsatisfiable."""
+    prover = Prover.of(knowledge)
+    return not prover.satisfiable(-prover.literal(query))
+
+
+class BDD():
+    """Reduced ordered binary decision diagram of a knowledge base. Nodes
+    are ints: 0 is false, 1 is true, and every other node tests a symbol
+    and has a low (symbol false) and a high (symbol true) child. A unique
+    table keeps each (symbol, low, high) node once, and an operation cache
+    remembers every apply, so operations take time polynomial in the size
+    of the diagrams. Symbols are ordered by first occurrence. Operations
+    walk the diagrams with explicit stacks, so diagrams may test more
+    symbols than the recursion limit."""
+
+    OPERATIONS = {
+        "and": lambda a, b: a and b,
+        "or": lambda a, b: a or b,
+        "xor": lambda a, b: a != b,
+        "implies": lambda a, b: not a or b,
+        "iff": lambda a, b: a == b,
+    }
+
+    def __init__(self, knowledge=None):
+        self.order = []
+        self.levels = {}
+        self.level = [math.inf, math.inf]
+        self.low = [0, 1]
+        self.high = [0, 1]
+        self.unique = {}
+        self.computed = {}
+        self.compiled = {}
+        self.counts = {}
+        self.root = 1 if knowledge is None else self.compile(knowledge)
+
+    @classmethod
+    def of(cls, knowledge):
+        """Returns the diagram of knowledge, cached on the sentence and
+        extended in place when knowledge is an And that grows."""
+        cache = knowledge.cache()
+        if "bdd" not in cache:
+            cache["bdd"] = cls(knowledge)
+        return cache["bdd"]
+
+    def node(self, level, low, high):
+        """Returns the node testing the symbol at level."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+        return self.unique[key]
+
+    def variable(self, name):
+        """Returns the node that is true exactly when symbol name is."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.node(self.levels[name], 0, 1)
+
+    def terminal(self, operation, u, v):
+        """Returns the node of u operation v if it needs no split on a
+        symbol or is already computed, otherwise None."""
+        if u <= 1 and v <= 1:
+            return int(BDD.OPERATIONS[operation](u == 1, v == 1))
+        if operation == "and":
+            if u == 0 or v == 0:
+                return 0
+            if u == 1 or u == v:
+                return v
+            if v == 1:
+                return u
+        elif operation == "or":
+            if u == 1 or v == 1:
+                return 1
+            if u == 0 or u == v:
+                return v
+            if v == 0:
+                return u
+        return self.computed.get((operation, u, v))
+
+    def apply(self, operation, u, v):
+        """Returns the node of u operation v, operation one of OPERATIONS."""
+        result = self.terminal(operation, u, v)
+        if result is not None:
+            record_applies(1)
+            return result
+
+        # Pairs on the stack need a split. Each is popped twice: first to
+        # push its children that need a split too, then, once their nodes
+        # are on results, to build its own node. A child not yet known is
+        # None, and its node comes off results, the high child's first.
+        stack = [(u, v, False, None, None)]
+        results = []
+        steps = 1
+        while stack:
+            u, v, expanded, low, high = stack.pop()
+            level = min(self.level[u], self.level[v])
+            if expanded:
+                if high is None:
+                    high = results.pop()
+                if low is None:
+                    low = results.pop()
+            else:
+                u0, u1 = (self.low[u], self.high[u]) if self.level[u] == level else (u, u)
+                v0, v1 = (self.low[v], self.high[v]) if self.level[v] == level else (v, v)
+                low = self.terminal(operation, u0, v0)
+                high = self.terminal(operation, u1, v1)
+                steps += 2
+                if low is None or high is None:
+                    stack.append((u, v, True, low, high))
+                    if high is None:
+                        stack.append((u1, v1, False, None, None))
+                    if low is None:
+                        stack.append((u0, v0, False, None, None))
+                    continue
+            node = self.node(level, low, high)
+            self.computed[(operation, u, v)] = node
+            results.append(node)
+        record_applies(steps)
+        return results.pop()
+
+    def negate(self, u):
+        """Returns the node of not u."""
+        return self.apply("xor", u, 1)
+
+    def compile(self, sentence):
+        """Returns the node of sentence."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        mutable = Sentence.mutable(sentence)
+        if not mutable and sentence in self.compiled:
+            return self.compiled[sentence]
+
+        if isinstance(sentence, Not):
+            u = self.negate(self.compile(sentence.operand))
+        elif isinstance(sentence, And):
+            u = 1
+            for conjunct in sentence.conjuncts:
+                u = self.apply("and", u, self.compile(conjunct))
+        elif isinstance(sentence, Or):
+            u = 0
+            for disjunct in sentence.disjuncts:
+                u = self.apply("or", u, self.compile(disjunct))
+        elif isinstance(sentence, Implication):
+            u = self.apply("implies", self.compile(sentence.antecedent),
+                           self.compile(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            u = self.apply("iff", self.compile(sentence.left), self.compile(sentence.right))
+        else:
+            raise TypeError("must be a logical sentence")
+
+        if not mutable:
+            self.compiled[sentence] = u
+        return u
+
+    def restrict(self, u, name, value):
+        """Returns the node of u with symbol name fixed to value."""
+        if name not in self.levels:
+            return u
+        level = self.levels[name]
+        stack = [(u, False)]
+        results = []
+        while stack:
+            u, expanded = stack.pop()
+            key = ("restrict", u, level, value)
+            if expanded:
+                high = results.pop()
+                low = results.pop()
+                self.computed[key] = self.node(self.level[u], low, high)
+                results.append(self.computed[key])
+            elif self.level[u] > level:
+                results.append(u)
+            elif self.level[u] == level:
+                results.append(self.high[u] if value else self.low[u])
+            elif key in self.computed:
+                results.append(self.computed[key])
+            else:
+                stack.extend([(u, True), (self.high[u], False), (self.low[u], False)])
+        return results.pop()
+
+    def count(self, u, symbols=None):
+        """Returns the number of models of u over symbols, by default all
+        symbols of the diagram; symbols must include every symbol u tests."""
+        if symbols is not None:
+            for name in symbols:
+                self.variable(name)
+        n = len(self.order)
+
+        def models(u):
+            """Models of u over the symbols from its level down, once every
+            node below u is counted."""
+            return u if u <= 1 else self.counts[(u, n)]
+
+        # Counts children before parents, keeping a node on the stack
+        # until none of its children is left to count.
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w <= 1 or (w, n) in self.counts:
+                stack.pop()
+                continue
+            children = [child for child in (self.low[w], self.high[w])
+                        if child > 1 and (child, n) not in self.counts]
+            if children:
+                stack.extend(children)
+                continue
+            stack.pop()
+            self.counts[(w, n)] = sum(
+                models(child) << (min(self.level[child], n) - self.level[w] - 1)
+                for child in (self.low[w], self.high[w])
+            )
+
+        total = models(u) << min(self.level[u], n)
+        if symbols is None:
+            return total
+        return total >> (n - len(set(symbols)))
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.apply("and", self.root, self.negate(self.compile(query))) == 0
+
+
+def model_check_bdd(knowledge, query):
+    """Checks if knowledge base entails query with the knowledge base
+    compiled to a decision diagram, which is reused by later queries."""
+    return BDD.of(knowledge).entails(query)
+
+
+class ModelCounter():
+    """Exact model counter (#SAT) for one knowledge base. Counts by DPLL
+    with unit propagation, splitting the clauses into independent
+    components whose counts multiply, and caching the count of every
+    component it meets, so later counts on the same knowledge base reuse
+    them. The Tseitin variables of CNF are fully defined by the symbols,
+    so counting models of the clauses counts models of the symbols."""
+
+    def __init__(self, knowledge):
+        self.cnf = CNF()
+        self.cnf.add(knowledge)
+        self.cache = {}
+
+    @classmethod
+    def of(cls, knowledge):
+        """Returns the model counter of knowledge, cached on the sentence."""
+        cache = knowledge.cache()
+        if "counter" not in cache:
+            cache["counter"] = cls(knowledge)
+        return cache["counter"]
+
+    def count(self, sentence=None, symbols=()):
+        """Returns the number of models of the knowledge base, and of
+        sentence if given, over their symbols and any extra symbols."""
+        extra = []
+        if sentence is not None:
+            extra.append(frozenset([self.cnf.literal(sentence)]))
+        for name in symbols:
+            self.cnf.variable(name)
+        clauses = [frozenset(clause) for clause in self.cnf.clauses] + extra
+        return self.count_clauses(clauses, frozenset(range(1, self.cnf.count + 1)))
+
+    def count_clauses(self, clauses, variables):
+        """Returns the number of assignments to variables that satisfy
+        clauses, whose variables must all be in variables. The search
+        keeps its own stack of counting generators, so its depth is not
+        limited by Python's recursion limit."""
+        stack = [self.counting(clauses, variables)]
+        value = None
+        while stack:
+            try:
+                branch = stack[-1].send(value)
+            except StopIteration as done:
+                stack.pop()
+                value = done.value
+            else:
+                stack.append(self.counting(*branch))
+                value = None
+        return value
+
+    def counting(self, clauses, variables):
+        """Generator counting the assignments to variables that satisfy
+        clauses: yields the clauses and variables of each branch it needs
+        counted and is sent back the count, returns the total."""
+        clauses, fixed = ModelCounter.propagate(clauses)
+        if clauses is None:
+            return 0
+
+        # Variables fixed by propagation count once, unused ones twice
+        used = {abs(literal) for clause in clauses for literal in clause}
+        total = 1 << len(variables - used - fixed)
+
+        for component in ModelCounter.components(clauses):
+            key = frozenset(component)
+            if key not in self.cache:
+                occurrences = {}
+                for clause in component:
+                    for literal in clause:
+                        occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+                variable = max(occurrences, key=occurrences.get)
+                count = 0
+                for literal in (variable, -variable):
+                    count += yield component + [frozenset([literal])], frozenset(occurrences)
+                self.cache[key] = count
+            total *= self.cache[key]
+            if total == 0:
+                return 0
+        return total
+
+    @staticmethod
+    def propagate(clauses):
+        """Returns clauses after unit propagation and the set of variables
+        it fixed, or None, None on a conflict. Clauses are indexed by
+        literal, so propagation takes time linear in their size."""
+        clauses = list(clauses)
+        occurrences = {}
+        for k, clause in enumerate(clauses):
+            for literal in clause:
+                occurrences.setdefault(literal, []).append(k)
+
+        alive = [True] * len(clauses)
+        units = [k for k, clause in enumerate(clauses) if len(clause) <= 1]
+        fixed = set()
+        while units:
+            k = units.pop()
+            if not alive[k]:
+                continue
+            if not clauses[k]:
+                return None, None
+            literal = next(iter(clauses[k]))
+            fixed.add(abs(literal))
+
+            # Clauses with literal are satisfied, the others lose -literal
+            for j in occurrences.get(literal, ()):
+                alive[j] = False
+            for j in occurrences.get(-literal, ()):
+                if alive[j]:
+                    clauses[j] = clauses[j] - {-literal}
+                    if len(clauses[j]) <= 1:
+                        units.append(j)
+
+        return [clause for k, clause in enumerate(clauses) if alive[k]], fixed
+
+    @staticmethod
+    def components(clauses):
+        """Returns clauses split into groups sharing no variables."""
+        parent = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for clause in clauses:
+            first = find(abs(next(iter(clause))))
+            for literal in clause:
+                parent[find(abs(literal))] = first
+
+        groups = {}
+        for clause in clauses:
+            groups.setdefault(find(abs(next(iter(clause)))), []).append(clause)
+        return list(groups.values())
+
+
+def count_models(knowledge, symbols=()):
+    """Returns the number of models of knowledge base over its symbols and
+    any extra symbols given."""
+    return ModelCounter.of(knowledge).count(symbols=symbols)
+
+
+def probability(knowledge, query):
+    """Returns the fraction of the models of knowledge base, over the
+    symbols of knowledge and query, in which query is true."""
+    counter = ModelCounter.of(knowledge)
+    total = counter.count(symbols=query.symbols())
+    if total == 0:
+        raise ValueError("knowledge base is unsatisfiable")
+    return counter.count(query) / total
+
+
+# Largest number of clauses a single sentence may distribute into before
+# it is converted with the Tseitin transformation instead
+CLAUSE_LIMIT = 256
+
+# Largest number of clauses resolution may keep before giving up
+RESOLUTION_LIMIT = 20000
+
+# Statistics of the most recent call to model_check_resolution
+proof_stats = {}
+
+
+def distribute(sentence, positive, cnf):
+    """Returns sentence (or its negation if not positive) as a list of
+    clauses, frozensets of literals numbered by cnf, by pushing negations
+    inwards and distributing Or over And. Returns None once the result
+    would be longer than CLAUSE_LIMIT."""
+    def product(left, right):
+        if left is None or right is None or len(left) * len(right) > CLAUSE_LIMIT:
+            return None
+        clauses = [a | b for a in left for b in right]
+        return [clause for clause in clauses if not any(-literal in clause for literal in clause)]
+
+    def concat(parts):
+        if any(part is None for part in parts) or sum(map(len, parts)) > CLAUSE_LIMIT:
+            return None
+        return [clause for part in parts for clause in part]
+
+    if isinstance(sentence, Symbol):
+        variable = cnf.variable(sentence.name)
+        return [frozenset([variable if positive else -variable])]
+    if isinstance(sentence, Not):
+        return distribute(sentence.operand, not positive, cnf)
+    if isinstance(sentence, (And, Or)):
+        parts = sentence.conjuncts if isinstance(sentence, And) else sentence.disjuncts
+        parts = [distribute(part, positive, cnf) for part in parts]
+        if isinstance(sentence, And) == positive:
+            return concat(parts)
+        result = [frozenset()]
+        for part in parts:
+            result = product(result, part)
+        return result
+    if isinstance(sentence, Implication):
+        antecedent = distribute(sentence.antecedent, not positive, cnf)
+        consequent = distribute(sentence.consequent, positive, cnf)
+        if positive:
+            return product(antecedent, consequent)
+        return concat([antecedent, consequent])
+    if isinstance(sentence, Biconditional):
+        left_true = distribute(sentence.left, True, cnf)
+        left_false = distribute(sentence.left, False, cnf)
+        right_true = distribute(sentence.right, positive, cnf)
+        right_false = distribute(sentence.right, not positive, cnf)
+        return concat([product(left_false, right_true), product(left_true, right_false)]) \
+            if positive else product(concat([left_true, right_true]), concat([left_false, right_false]))
+    raise TypeError("must be a logical sentence")
+
+
+def clauses(sentence, cnf):
+    """Returns clauses equivalent to sentence, as frozensets of literals
+    numbered by cnf. Each conjunct is distributed if it stays small and
+    converted with the Tseitin transformation otherwise."""
+    if isinstance(sentence, And):
+        return [clause for conjunct in sentence.conjuncts for clause in clauses(conjunct, cnf)]
+    result = distribute(sentence, True, cnf)
+    if result is None:
+        defined = len(cnf.clauses)
+        literal = cnf.literal(sentence)
+        result = [frozenset(clause) for clause in cnf.clauses[defined:]] + [frozenset([literal])]
+    return result
+
+
+def horn(clause):
+    """Checks if clause has at most one positive literal."""
+    return sum(literal > 0 for literal in clause) <= 1
+
+
+def horn_satisfiable(clauses):
+    """Checks if Horn clauses are satisfiable by forward chaining: every
+    clause keeps a count of its premises not yet known true, and a fact is
+    derived when a count reaches zero. Takes time linear in their size."""
+    premises = []
+    heads = []
+    watching = {}
+    agenda = []
+    for n, clause in enumerate(clauses):
+        head = next((literal for literal in clause if literal > 0), None)
+        heads.append(head)
+        premises.append(len(clause) - (head is not None))
+        for literal in clause:
+            if literal < 0:
+                watching.setdefault(-literal, []).append(n)
+        if premises[n] == 0:
+            if head is None:
+                return False
+            agenda.append(head)
+
+    inferred = set()
+    while agenda:
+        symbol = agenda.pop()
+        if symbol in inferred:
+            continue
+        inferred.add(symbol)
+        for n in watching.get(symbol, []):
+            premises[n] -= 1
+            if premises[n] == 0:
+                if heads[n] is None:
+                    proof_stats["inferred"] = len(inferred)
+                    return False
+                agenda.append(heads[n])
+    proof_stats["inferred"] = len(inferred)
+    return True
+
+
+def resolution_refutes(usable, support):
+    """Checks if resolution derives the empty clause from clauses usable
+    and support, resolving only with at least one parent descended from
+    the set of support. Clauses are indexed by literal, shortest given
+    clauses are processed first and subsumed clauses are dropped. Returns
+    None if RESOLUTION_LIMIT clauses are kept without an answer."""
+    index = {}
+    kept = set()
+
+    def subsumed(clause):
+        for literal in clause:
+            for other in index.get(literal, ()):
+                if other <= clause:
+                    return True
+        return False
+
+    def keep(clause):
+        # Backward subsumption: clause replaces the clauses it subsumes
+        literal = next(iter(clause))
+        for other in list(index.get(literal, ())):
+            if clause < other:
+                kept.discard(other)
+                for other_literal in other:
+                    index[other_literal].discard(other)
+                proof_stats["subsumed"] += 1
+        kept.add(clause)
+        for literal in clause:
+            index.setdefault(literal, set()).add(clause)
+
+    for clause in sorted(usable, key=len):
+        if not clause:
+            return True
+        if not subsumed(clause):
+            keep(clause)
+
+    queue = [(len(clause), n, clause) for n, clause in enumerate(support)]
+    heapq.heapify(queue)
+    count = len(queue)
+    while queue:
+        _, _, given = heapq.heappop(queue)
+        if not given:
+            return True
+        if subsumed(given):
+            proof_stats["subsumed"] += 1
+            continue
+        proof_stats["given"] += 1
+
+        for literal in given:
+            for other in list(index.get(-literal, ())):
+                resolvent = (given - {literal}) | (other - {-literal})
+                proof_stats["resolvents"] += 1
+                if not resolvent:
+                    return True
+                if any(-r in resolvent for r in resolvent) or subsumed(resolvent):
+                    continue
+                count += 1
+                heapq.heappush(queue, (len(resolvent), count, resolvent))
+        keep(given)
+        if len(kept) + len(queue) > RESOLUTION_LIMIT:
+            return None
+    return False
+
+
+def model_check_resolution(knowledge, query):
+    """Checks if knowledge base entails query by refuting knowledge and
+    not query at the clause level: with linear-time forward chaining when
+    all clauses are Horn, and by set of support resolution otherwise.
+    Statistics of the proof are left in proof_stats."""
+    cnf = CNF()
+    knowledge_clauses = clauses(knowledge, cnf)
+    query_clauses = clauses(Not(query), cnf)
+
+    proof_stats.clear()
+    proof_stats.update(clauses=len(knowledge_clauses) + len(query_clauses),
+                       inferred=0, given=0, resolvents=0, subsumed=0)
+
+    if all(horn(clause) for clause in knowledge_clauses + query_clauses):
+        proof_stats["method"] = "horn"
+        return not horn_satisfiable(knowledge_clauses + query_clauses)
+
+    proof_stats["method"] = "resolution"
+    refuted = resolution_refutes(knowledge_clauses, query_clauses)
+    if refuted is None:
+        proof_stats["method"] = "sat"
+        return model_check_sat(knowledge, query)
+    if not refuted:
+        # Set of support is only complete when knowledge is consistent
+        return not Prover.of(knowledge).satisfiable()
+    return True
+
+
+# Models evaluated at once by the truth table backend, as a power of two
+CHUNK_BITS = 20
+
+# Largest number of symbols for which model_check uses the truth table
+TRUTH_TABLE_LIMIT = 20
+
+# Bit patterns of the first six symbols within one 64-bit word of models
+WORD_PATTERNS = [0xAAAAAAAAAAAAAAAA, 0xCCCCCCCCCCCCCCCC, 0xF0F0F0F0F0F0F0F0,
+                 0xFF00FF00FF00FF00, 0xFFFF0000FFFF0000, 0xFFFFFFFF00000000]
+
+
+def truth_table(sentence, columns):
+    """Returns the packed bit-vector of the truth values of sentence, given
+    a packed bit-vector column for each symbol name."""
+    if isinstance(sentence, Symbol):
+        return columns[sentence.name]
+    if isinstance(sentence, Not):
+        return ~truth_table(sentence.operand, columns)
+    if isinstance(sentence, And):
+        # Scalars broadcast against the columns, and need no symbol
+        result = ~np.uint64(0)
+        for conjunct in sentence.conjuncts:
+            result = result & truth_table(conjunct, columns)
+        return result
+    if isinstance(sentence, Or):
+        result = np.uint64(0)
+        for disjunct in sentence.disjuncts:
+            result = result | truth_table(disjunct, columns)
+        return result
+    if isinstance(sentence, Implication):
+        return ~truth_table(sentence.antecedent, columns) | truth_table(sentence.consequent, columns)
+    if isinstance(sentence, Biconditional):
+        return ~(truth_table(sentence.left, columns) ^ truth_table(sentence.right, columns))
+    raise TypeError("must be a logical sentence")
+
+
+def symbol_column(k, words):
+    """Returns the packed values of symbol k over 64 * words models, where
+    model number m gives symbol k the value of bit k of m."""
+    if k < 6:
+        return np.full(words, WORD_PATTERNS[k], dtype=np.uint64)
+    return np.where((np.arange(words) >> (k - 6)) & 1, ~np.uint64(0), np.uint64(0))
+
+
+def truth_table_chunks(symbols):
+    """Yields, for each chunk of 2 ** CHUNK_BITS models over symbols, the
+    packed columns of all symbols and a mask of the models that exist."""
+    low = min(len(symbols), CHUNK_BITS)
+    words = max(1, 2 ** low // 64)
+
+    # Models past 2 ** low in the only word of a small table do not exist
+    valid = np.uint64((1 << 2 ** low) - 1 if low < 6 else 2 ** 64 - 1)
+
+    columns = {name: symbol_column(k, words) for k, name in enumerate(symbols[:low])}
+    for high in range(2 ** (len(symbols) - low)):
+
+        # Remaining symbols are constant within a chunk
+        for k, name in enumerate(symbols[low:]):
+            columns[name] = np.full(words, ~np.uint64(0) if high >> k & 1 else 0, dtype=np.uint64)
+
+        yield columns, valid
+
+
+def model_check_truth_table(knowledge, query):
+    """Checks if knowledge base entails query by evaluating both over all
+    models at once with NumPy bit-vectors, CHUNK_BITS symbols at a time."""
+    if np is None:
+        raise ImportError("the truth table backend needs numpy")
+
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    record_models(2 ** len(symbols))
+    for columns, valid in truth_table_chunks(symbols):
+        counter_models = truth_table(knowledge, columns) & ~truth_table(query, columns) & valid
+        if counter_models.any():
+            return False
+    return True
+
+
+def model_check_auto(knowledge, query):
+    """Checks if knowledge base entails query, with a truth table for small
+    knowledge bases and the SAT solver otherwise."""
+    if np is not None and len(knowledge.symbols() | query.symbols()) <= TRUTH_TABLE_LIMIT:
+        return model_check_truth_table(knowledge, query)
+    return model_check_sat(knowledge, query)
+
+
+# Entailment checkers selectable by model_check
+BACKENDS = {
+    "auto": model_check_auto,
+    "bdd": model_check_bdd,
+    "sat": model_check_sat,
+    "enumerate": model_check_enumerate,
+    "reference": model_check_reference,
+    "parallel": model_check_parallel,
+    "resolution": model_check_resolution,
+    "truth-table": model_check_truth_table,
+}
+
+
+def model_check(knowledge, query, method="auto"):
+    """Checks if knowledge base entails query. method is one of BACKENDS;
+    "auto" picks the truth table for small knowledge bases and the SAT
+    solver for larger ones, and "reference" is the original enumerator,
+    for cross-checking."""
+    if method not in BACKENDS:
+        raise ValueError(f"unknown method {method}")
+    return BACKENDS[method](knowledge, query)
+
+
+# Answers of model_check_many
+ENTAILED = "entailed"
+REFUTED = "refuted"
+UNKNOWN = "unknown"
+
+
+def model_check_many_truth_table(knowledge, queries):
+    """model_check_many over one shared truth table of the knowledge base."""
+    if np is None:
+        raise ImportError("the truth table backend needs numpy")
+
+    symbols = sorted(knowledge.symbols().union(*[query.symbols() for query in queries]))
+    possible = {query: set() for query in queries}
+    record_models(2 ** len(symbols))
+    for columns, valid in truth_table_chunks(symbols):
+        models = truth_table(knowledge, columns) & valid
+        for query in queries:
+            values = truth_table(query, columns)
+            if (models & values).any():
+                possible[query].add(True)
+            if (models & ~values).any():
+                possible[query].add(False)
+    return possible
+
+
+def model_check_many_sat(knowledge, queries):
+    """model_check_many with one incremental SAT solver. Every model found
+    rules out answers for all queries at once, so most queries need no
+    solver call of their own."""
+    prover = Prover.of(knowledge)
+    literals = {query: prover.literal(query) for query in queries}
+    possible = {query: set() for query in queries}
+
+    def record():
+        for query, literal in literals.items():
+            possible[query].add(prover.value(literal))
+
+    if not prover.satisfiable():
+        return possible
+    record()
+
+    for query, literal in literals.items():
+        if False not in possible[query] and prover.satisfiable(-literal):
+            record()
+        if True not in possible[query] and prover.satisfiable(literal):
+            record()
+    return possible
+
+
+def model_check_many(knowledge, queries, method="auto"):
+    """Checks each query against knowledge base, sharing the work between
+    queries. Returns a dict mapping each query to ENTAILED if knowledge
+    entails it, REFUTED if knowledge entails its negation and UNKNOWN
+    otherwise, so ENTAILED exactly when model_check(knowledge, query).
+    An unsatisfiable knowledge base entails every query."""
+    queries = list(dict.fromkeys(queries))
+    if method == "auto":
+        symbols = knowledge.symbols().union(*[query.symbols() for query in queries])
+        method = "truth-table" if np is not None and len(symbols) <= TRUTH_TABLE_LIMIT else "sat"
+
+    if method == "truth-table":
+        possible = model_check_many_truth_table(knowledge, queries)
+    elif method == "sat":
+        possible = model_check_many_sat(knowledge, queries)
+    else:
+        possible = {}
+        for query in queries:
+            possible[query] = set()
+            if not model_check(knowledge, query, method):
+                possible[query].add(False)
+            if not model_check(knowledge, Not(query), method):
+                possible[query].add(True)
+
+    answers = {}
+    for query in queries:
+        if False not in possible[query]:
+            answers[query] = ENTAILED
+        elif True not in possible[query]:
+            answers[query] = REFUTED
+        else:
+            answers[query] = UNKNOWN
+    return answers
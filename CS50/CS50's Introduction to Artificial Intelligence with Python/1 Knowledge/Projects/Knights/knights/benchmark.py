@@ -0,0 +1,206 @@
+"""
+Benchmark of the logic.py entailment backends.
+
+Runs every backend on the knights puzzles, the lecture's clue and
+mastermind knowledge bases and generated larger puzzles, checks that all
+backends agree with the reference enumerator (or, on problems too large
+for it, with each other) and prints a JSON report.
+
+Usage:
+    python benchmark.py [report.json] [--scale n]
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import runpy
+import sys
+import time
+
+import logic
+import puzzle
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Lecture examples, next to this project in the course tree
+LECTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       "..", "..", "..", "Lecture Source Code", "src")
+
+# Most symbols a backend is run on; larger problems are skipped
+SYMBOL_LIMITS = {
+    "reference": 16,
+    "truth-table": 24,
+    "enumerate": 40,
+    "parallel": 40,
+    "resolution": 20,
+}
+
+
+def lecture_problem(name):
+    """
+    Returns the knowledge base and symbols of a lecture script, run with
+    its output discarded.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        variables = runpy.run_path(os.path.join(LECTURE, name))
+    return variables["knowledge"], variables["symbols"]
+
+
+def knights_and_knaves(people, seed=0):
+    """
+    Returns a random knights and knaves puzzle: every person says one thing
+    about the others, consistent with a hidden assignment of knights.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{k} is a Knight") for k in range(people)]
+    knaves = [Symbol(f"{k} is a Knave") for k in range(people)]
+    hidden = [rng.random() < 0.5 for _ in range(people)]
+
+    knowledge = And()
+    for k in range(people):
+        knowledge.add(Biconditional(knights[k], Not(knaves[k])))
+
+        a, b = rng.sample(range(people), 2)
+        statement, value = rng.choice([
+            (knaves[a], not hidden[a]),
+            (Biconditional(knights[a], knights[b]), hidden[a] == hidden[b]),
+            (Or(knights[a], knights[b]), hidden[a] or hidden[b]),
+            (Implication(knights[a], knaves[b]), not hidden[a] or not hidden[b]),
+        ])
+        if value != hidden[k]:
+            statement = Not(statement)
+        knowledge.add(Biconditional(knights[k], statement))
+
+    return knowledge, knights + knaves
+
+
+def mastermind(size, guesses, seed=0):
+    """
+    Returns a random mastermind game with size colors and positions: the
+    rules of the lecture version and guesses random guesses, each with the
+    number of colors in the right position.
+    """
+    rng = random.Random(seed)
+    cell = [[Symbol(f"color{c}position{p}") for p in range(size)] for c in range(size)]
+    secret = rng.sample(range(size), size)
+
+    knowledge = And()
+    for c in range(size):
+        knowledge.add(Or(*cell[c]))
+        for i, j in itertools.permutations(range(size), 2):
+            knowledge.add(Implication(cell[c][i], Not(cell[c][j])))
+            knowledge.add(Implication(cell[i][c], Not(cell[j][c])))
+
+    for _ in range(guesses):
+        guess = rng.sample(range(size), size)
+        right = sum(guess[p] == secret[p] for p in range(size))
+        knowledge.add(Or(*[
+            And(*[cell[guess[p]][p] if p in correct else Not(cell[guess[p]][p])
+                  for p in range(size)])
+            for correct in itertools.combinations(range(size), right)
+        ]))
+
+    return knowledge, [symbol for column in cell for symbol in column]
+
+
+def problems(scale):
+    """
+    Returns the benchmark problems by name, as functions building a fresh
+    knowledge base and its queries, so no backend reuses another's caches
+    on the knowledge base.
+    """
+    result = {}
+    for k in range(4):
+        result[f"knights{k}"] = (
+            lambda k=k: (And(*getattr(puzzle, f"knowledge{k}").conjuncts),
+                         [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+                          puzzle.BKnave, puzzle.CKnight, puzzle.CKnave])
+        )
+    for name in ["clue", "mastermind"]:
+        knowledge, symbols = lecture_problem(f"{name}.py")
+        result[name] = lambda knowledge=knowledge, symbols=symbols: (
+            And(*knowledge.conjuncts), symbols
+        )
+    for people in [4 * scale, 8 * scale]:
+        result[f"knights-{people}"] = lambda people=people: knights_and_knaves(people)
+    for size in [4 + scale, 5 + scale]:
+        result[f"mastermind-{size}"] = lambda size=size: mastermind(size, size)
+    return result
+
+
+def run(knowledge, queries, method):
+    """
+    Checks each query and its negation with method, under the profiler.
+    Returns the answers and the measurements; profile counters the
+    backend never touched are left out.
+    """
+    logic.proof_stats.clear()
+    with logic.profiling() as profile:
+        start = time.perf_counter()
+        answers = [[logic.model_check(knowledge, query, method),
+                    logic.model_check(knowledge, Not(query), method)]
+                   for query in queries]
+        seconds = time.perf_counter() - start
+
+    result = {"seconds": seconds, "ms/query": 1000 * seconds / len(queries)}
+    result.update((name, value) for name, value in profile.items() if value)
+    if logic.proof_stats:
+        result["proof"] = dict(logic.proof_stats)
+    return answers, result
+
+
+def benchmark(scale=1):
+    """
+    Runs every backend on every problem and returns the report.
+    """
+    report = {"cpus": os.cpu_count(), "numpy": logic.np is not None, "problems": {}}
+
+    for name, build in problems(scale).items():
+        knowledge, queries = build()
+        symbols = knowledge.symbols().union(*[query.symbols() for query in queries])
+        entry = {"symbols": len(symbols), "queries": len(queries), "backends": {}}
+        reference = None
+
+        # The reference enumerator runs first, so the others are checked against it
+        methods = ["reference"] + [method for method in logic.BACKENDS if method != "reference"]
+        for method in methods:
+            if len(symbols) > SYMBOL_LIMITS.get(method, len(symbols)):
+                entry["backends"][method] = {"skipped": "too many symbols"}
+                continue
+            if method == "truth-table" and logic.np is None:
+                entry["backends"][method] = {"skipped": "numpy not installed"}
+                continue
+
+            knowledge, queries = build()
+            answers, result = run(knowledge, queries, method)
+            if reference is None:
+                reference = answers
+                entry["reference"] = method
+            result["agrees"] = answers == reference
+            entry["backends"][method] = result
+
+        entry["agree"] = all(result.get("agrees", True) for result in entry["backends"].values())
+        report["problems"][name] = entry
+        print(f"{name}: {len(symbols)} symbols, "
+              f"{'agree' if entry['agree'] else 'DISAGREE'}", file=sys.stderr)
+
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    scale = 1
+    if "--scale" in args:
+        k = args.index("--scale")
+        scale = int(args[k + 1])
+        del args[k:k + 2]
+
+    report = benchmark(scale)
+    if args:
+        with open(args[0], "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(0 if all(entry["agree"] for entry in report["problems"].values()) else 1)
@@ -0,0 +1,163 @@
+"""
+Headless benchmark of MinesweeperAI.
+
+Plays seeded games of Minesweeper against MinesweeperAI in a pool of
+processes and prints a JSON report of win rate, moves per game, move
+latency percentiles and knowledge base size over the game.
+
+Usage:
+    python benchmark.py [preset or HxWxM ...] [--games n] [--processes n]
+                        [--seed n] [--output report.json]
+
+Presets are beginner, intermediate and expert; the default is all three.
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Board height, width and number of mines of each preset
+PRESETS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+}
+
+# Moves between knowledge base size samples
+SAMPLE_EVERY = 10
+
+
+def play(height, width, mines, seed):
+    """
+    Plays one game with the given seed for the board and the AI's random
+    choices. Returns the outcome, move latencies and knowledge base size
+    after every SAMPLE_EVERY moves.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+
+    latencies = []
+    knowledge = []
+    safe_cells = height * width - mines
+    won = False
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        ai.add_knowledge(move, game.nearby_mines(move))
+        latencies.append(time.perf_counter() - start)
+
+        if len(latencies) % SAMPLE_EVERY == 0:
+            knowledge.append(len(ai.knowledge))
+        if len(ai.moves_made) == safe_cells:
+            won = True
+            break
+
+    return {"won": won, "latencies": latencies, "knowledge": knowledge}
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which fraction of the sorted values lie.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(results):
+    """
+    Returns the report of one board from the results of its games.
+    """
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    moves = [len(result["latencies"]) for result in results]
+
+    # Mean knowledge base size at each sample point reached by any game
+    samples = max(len(result["knowledge"]) for result in results)
+    knowledge = [
+        statistics.mean(result["knowledge"][k] for result in results if len(result["knowledge"]) > k)
+        for k in range(samples)
+    ]
+
+    report = {
+        "games": len(results),
+        "win_rate": sum(result["won"] for result in results) / len(results),
+        "moves_per_game": statistics.mean(moves),
+        "knowledge": {"sample_every": SAMPLE_EVERY, "mean_size": knowledge},
+    }
+    if latencies:
+        report["latency_ms"] = {
+            "mean": 1000 * statistics.mean(latencies),
+            "p50": 1000 * percentile(latencies, 0.50),
+            "p90": 1000 * percentile(latencies, 0.90),
+            "p99": 1000 * percentile(latencies, 0.99),
+            "max": 1000 * latencies[-1],
+        }
+    return report
+
+
+def board(name):
+    """
+    Returns the height, width and mines of a preset name or of a custom
+    board written HxWxM, e.g. 30x30x150.
+    """
+    if name in PRESETS:
+        return PRESETS[name]
+    try:
+        height, width, mines = (int(n) for n in name.split("x"))
+    except ValueError:
+        raise ValueError(f"unknown board {name}, expected a preset or HxWxM")
+    if not 0 <= mines < height * width:
+        raise ValueError(f"board {name} cannot hold {mines} mines")
+    return height, width, mines
+
+
+def benchmark(boards, games=100, processes=None, seed=0):
+    """
+    Plays games games on each board, seeds seed onwards, and returns the
+    report.
+    """
+    processes = processes or os.cpu_count() or 1
+    report = {"processes": processes, "seed": seed, "boards": {}}
+
+    with ProcessPoolExecutor(processes) as pool:
+        for name in boards:
+            height, width, mines = board(name)
+            start = time.perf_counter()
+            futures = [pool.submit(play, height, width, mines, seed + k) for k in range(games)]
+            results = [future.result() for future in futures]
+
+            entry = {"height": height, "width": width, "mines": mines}
+            entry.update(summarize(results))
+            entry["seconds"] = time.perf_counter() - start
+            report["boards"][name] = entry
+            print(f"{name}: won {entry['win_rate']:.0%} of {games} games", file=sys.stderr)
+
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--games": 100, "--processes": None, "--seed": 0, "--output": None}
+    for option in options:
+        if option in args:
+            k = args.index(option)
+            options[option] = args[k + 1] if option == "--output" else int(args[k + 1])
+            del args[k:k + 2]
+
+    report = benchmark(args or list(PRESETS), options["--games"],
+                       options["--processes"], options["--seed"])
+    if options["--output"]:
+        with open(options["--output"], "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
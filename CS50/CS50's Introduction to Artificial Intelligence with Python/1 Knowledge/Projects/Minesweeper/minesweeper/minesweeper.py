@@ -1,5 +1,9 @@
 import itertools
+import math
 import random
+from collections import deque
+
+import numpy as np
 
 
 class Minesweeper():
@@ -12,23 +16,30 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines at distinct random cells, drawn at once. The generator
+        # is seeded from random, so random.seed still fixes the board.
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        rows, columns = np.divmod(positions, width)
+        self.mines = set(zip(rows.tolist(), columns.tolist()))
+
+        # Number of mines around every cell: the 3x3 box sum of the board
+        # (a convolution with a kernel of ones) less the cell itself
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        self.counts = sum(
+            padded[i:i + height, j:j + width] for i in range(3) for j in range(3)
+        ) - self.board
+
+        # Cells revealed by reveal, as a view into a board with a border
+        # of cells that count as revealed, so flat indices of neighbours
+        # never wrap around a row
+        self.shown = np.ones((height + 2, width + 2), dtype=bool)
+        self.revealed = self.shown[1:-1, 1:-1]
+        self.revealed[:] = False
+        self.empty = np.pad(self.counts == 0, 1)
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +52,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i, j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +61,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +69,41 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Reveals a cell and returns the list of cells it uncovers: the
+        cell itself and, if no mine is around it, every cell around it,
+        repeating for each uncovered cell with no mine around it.
+        Cells revealed before are not returned again.
+        """
+        i, j = cell
+        if self.revealed[i, j]:
+            return []
+        self.revealed[i, j] = True
+        if self.board[i, j] or self.counts[i, j]:
+            return [cell]
+
+        # Breadth first over flat indices of the bordered board, a whole
+        # frontier of cells with no mine around them at a time
+        stride = self.width + 2
+        shown = self.shown.reshape(-1)
+        empty = self.empty.reshape(-1)
+        offsets = np.array([-stride - 1, -stride, -stride + 1, -1, 1,
+                            stride - 1, stride, stride + 1])
+        frontier = np.array([(i + 1) * stride + j + 1])
+        uncovered = [frontier]
+        while frontier.size:
+            around = np.unique((frontier[:, None] + offsets).reshape(-1))
+            around = around[~shown[around]]
+            shown[around] = True
+            uncovered.append(around)
+            frontier = around[empty[around]]
+
+        rows, columns = np.divmod(np.concatenate(uncovered), stride)
+        return list(zip((rows - 1).tolist(), (columns - 1).tolist()))
 
     def won(self):
         """
@@ -137,16 +165,119 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class MaskSentence():
+    """
+    Sentence with its cells as a bitmask: cell (i, j) of a board of the
+    given width is bit i * width + j. Subsets, differences and sizes are
+    single integer operations, and sentences hash by cells and count.
+    Marking a cell changes the hash, so a sentence must be taken out of
+    any set or dict before it is marked; MinesweeperAI keys its sentences
+    by (mask, count) instead.
+    """
+
+    def __init__(self, mask, count, width):
+        self.mask = mask
+        self.count = count
+        self.width = width
+
+    @classmethod
+    def from_cells(cls, cells, count, width):
+        mask = 0
+        for i, j in cells:
+            mask |= 1 << (i * width + j)
+        return cls(mask, count, width)
+
+    def __eq__(self, other):
+        return self.mask == other.mask and self.count == other.count
+
+    def __hash__(self):
+        return hash((self.mask, self.count))
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    @property
+    def cells(self):
+        """
+        The set of cells in the sentence.
+        """
+        return {divmod(k, self.width) for k in self.bits()}
+
+    def bits(self):
+        """
+        Returns the list of bit numbers of the cells in the sentence.
+        """
+        bits = []
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            bits.append(low.bit_length() - 1)
+            mask ^= low
+        return bits
+
+    def bit(self, cell):
+        return 1 << (cell[0] * self.width + cell[1])
+
+    def issubset(self, other):
+        return self.mask & ~other.mask == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of self not in other, when
+        other is a subset of self.
+        """
+        return MaskSentence(self.mask & ~other.mask, self.count - other.count, self.width)
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if len(self) == self.count:
+            return self.cells
+
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+
+        return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        self.mask &= ~self.bit(cell)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines
         self.height = height
         self.width = width
+        self.mine_count = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -155,26 +286,127 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge: list[Sentence] = []
+        # Cells marked safe, in order, that may not have been played yet
+        self.pending = deque()
+
+        # Cells neither played nor known to be mines, in any order, and
+        # the position of each in the list, to remove one by swapping it
+        # with the last
+        self.candidates = [(i, j) for i in range(height) for j in range(width)]
+        self.slot = {cell: k for k, cell in enumerate(self.candidates)}
+
+        # Sentences about the game known to be true, by mask and count
+        self.knowledge: dict[tuple[int, int], MaskSentence] = {}
+
+        # Sentences containing each cell, by bit number, so marking a
+        # cell only touches the sentences it is in. Sentences emptied or
+        # merged into a duplicate have mask 0 and are skipped.
+        self.index = {}
+
+        # Sentences added or changed since inference last looked at them
+        self.worklist = []
+
+        # Mine configurations of frontier components, by the sentences
+        # of the component, kept while the component is unchanged
+        self.components = {}
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        if cell in self.mines:
+            return
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.remove_candidate(cell)
+        for sentence in self.index.pop(cell[0] * self.width + cell[1], ()):
+            self.update(sentence, sentence.mark_mine, cell)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell in self.safes:
+            return
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if cell not in self.moves_made:
+            self.pending.append(cell)
+        for sentence in self.index.pop(cell[0] * self.width + cell[1], ()):
+            self.update(sentence, sentence.mark_safe, cell)
+
+    def remove_candidate(self, cell):
+        """
+        Removes a cell from the candidates for a random move.
+        """
+        k = self.slot.pop(cell, None)
+        if k is None:
+            return
+        last = self.candidates.pop()
+        if k < len(self.candidates):
+            self.candidates[k] = last
+            self.slot[last] = k
+
+    def update(self, sentence, mark, cell):
+        """
+        Applies mark to cell in a sentence of the knowledge base, then
+        keeps it for inference unless it became empty or a duplicate.
+        """
+        if not sentence.mask:
+            return
+
+        del self.knowledge[sentence.mask, sentence.count]
+        mark(cell)
+        if sentence.mask and (sentence.mask, sentence.count) not in self.knowledge:
+            self.knowledge[sentence.mask, sentence.count] = sentence
+            self.worklist.append(sentence)
+        else:
+            sentence.mask = 0
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence over unknown cells to the knowledge base,
+        unless it is empty or already known.
+        """
+        if not sentence.mask or (sentence.mask, sentence.count) in self.knowledge:
+            return
+
+        self.knowledge[sentence.mask, sentence.count] = sentence
+        for k in sentence.bits():
+            self.index.setdefault(k, []).append(sentence)
+        self.worklist.append(sentence)
+
+    def infer(self):
+        """
+        Draws conclusions from the sentences on the worklist until
+        there are none left. A sentence is only compared with the
+        sentences sharing a cell with it, since no other sentence can
+        be a subset or superset of it.
+        """
+        while self.worklist:
+            sentence = self.worklist.pop()
+            if not sentence.mask:
+                continue
+
+            # Every cell of the sentence is safe or every cell is a mine
+            if sentence.count == 0 or sentence.count == len(sentence):
+                mark = self.mark_safe if sentence.count == 0 else self.mark_mine
+                for cell in sentence.cells:
+                    mark(cell)
+                continue
+
+            # Subset inference against overlapping sentences
+            others = {
+                id(other): other
+                for k in sentence.bits()
+                for other in self.index.get(k, ())
+                if other.mask and other is not sentence
+            }
+            for other in others.values():
+                if sentence.issubset(other):
+                    self.add_sentence(other.difference(sentence))
+                elif other.issubset(sentence):
+                    self.add_sentence(sentence.difference(other))
 
     def add_knowledge(self, cell, count):
         """
@@ -192,116 +424,160 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
         self.moves_made.add(cell)
-        self.safes.add(cell)
-        
-        # Appending the sentence: {cell's neighbours} = count
+        self.remove_candidate(cell)
+        self.mark_safe(cell)
+
+        # Appending the sentence: {cell's unknown neighbours} = count
+        # less the neighbours known to be mines
         neighbours = set()
         for i in range(cell[0] - 1, cell[0] + 2):
             for j in range(cell[1] - 1, cell[1] + 2):
 
-                if (i, j) == cell or self.safes.issuperset((i, j)) or self.mines.issuperset((i, j)):
+                if (i, j) == cell or (i, j) in self.safes:
                     continue
 
                 if 0 <= i < self.height and 0 <= j < self.width:
-                    neighbours.add((i, j))
+                    if (i, j) in self.mines:
+                        count -= 1
+                    else:
+                        neighbours.add((i, j))
 
-        if len(neighbours) > 0:
-            self.knowledge.append(Sentence(neighbours, count))
+        self.add_sentence(MaskSentence.from_cells(neighbours, count, self.width))
 
         # Infering
-        new_knowledge = True
-
-        while new_knowledge:
-
-            new_knowledge = False
+        self.infer()
 
-            # Testing if a sentence has only tiles that are known to be safe, deletes the whole sentence if yes
-            for sentence in reversed(self.knowledge):
-                ks = sentence.known_safes()
-
-                if len(ks) != 0 and not ks.issubset(self.safes):
-                    self.safes = self.safes.union(ks)
-
-                    self.knowledge.remove(sentence)
-                    new_knowledge = True
-
-            # Testing if a sentence has only tiles that are known to be mines, deletes the whole sentence if yes
-            for sentence in reversed(self.knowledge):
-                km = sentence.known_mines()
-
-                if len(km) != 0 and not km.issubset(self.mines):
-                    self.mines = self.mines.union(km)
-
-                    self.knowledge.remove(sentence)
-                    new_knowledge = True
-
-            # Testing if a sentence has a tile that is known to be safe, deletes it if yes
-            for sentence in self.knowledge:
-                for safe in self.safes:
-                    if safe in sentence.cells:
-                        sentence.mark_safe(safe)
-
-                        new_knowledge = True
-
-            # Testing if a sentence has a tile that is known to be a mine, deletes it and decrements the count of the sentence by one if yes
-            for sentence in self.knowledge:
-                for mine in self.mines:
-                    if mine in sentence.cells:
-                        sentence.mark_mine(mine)
-
-                        new_knowledge = True
-            
-            # Deletes any sentences that are empty because of mark_safe and mark_mine functions
-            for sentence in reversed(self.knowledge):
-                if len(sentence.cells) == 0:
-                    self.knowledge.remove(sentence)
-
-                    new_knowledge = True
-
-            # Testing if one sentence contains second sentence, infers new sentence that is built of the difference of
-            # two tile sets and the difference of counts
-            for s1 in self.knowledge:
-                for s2 in self.knowledge:
-
-                    if s1 == s2:
-                        continue
-
-                    if s1.cells.issubset(s2.cells):
-                        new_set = s2.cells - s1.cells
-                        new_count = s2.count - s1.count
-
-                        new_knowledge = True
-
-                        if new_count == 0:
-                            self.safes = self.safes.union(new_set)
-                            continue
-
-                        if len(new_set) and new_count == 1:
-                            self.mines = self.mines.union(new_set)
-                            continue
-
-                        new_sentence = Sentence(new_set, new_count)
-
-                        if not new_sentence in self.knowledge:
-                            self.knowledge.append(new_sentence)
-                    elif s2.cells.issubset(s1.cells):
-                        new_set = s1.cells - s2.cells
-                        new_count = s1.count - s2.count
-
-                        new_knowledge = True
-
-                        if new_count == 0:
-                            self.safes = self.safes.union(new_set)
-                            continue
+    def frontier(self):
+        """
+        Returns the sentences of the knowledge base split into groups
+        that share no cells, so their mines can be counted separately.
+        """
+        parent = {}
+
+        def find(k):
+            while parent.setdefault(k, k) != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        sentences = list(self.knowledge.values())
+        for sentence in sentences:
+            bits = sentence.bits()
+            root = find(bits[0])
+            for k in bits[1:]:
+                parent[find(k)] = root
+
+        groups = {}
+        for sentence in sentences:
+            groups.setdefault(find(sentence.bits()[0]), []).append(sentence)
+        return list(groups.values())
+
+    @staticmethod
+    def configurations(sentences):
+        """
+        Counts the mine configurations of the cells of sentences that
+        satisfy all of them. Returns the cells, by bit number, and a dict
+        mapping each number of mines to the number of configurations
+        with that many mines and, per cell, how many of those have a
+        mine in the cell.
+        """
+        cells = sorted(set().union(*[sentence.bits() for sentence in sentences]))
+        position = {k: p for p, k in enumerate(cells)}
+        members = [[position[k] for k in sentence.bits()] for sentence in sentences]
+
+        # Sentences each cell is in, and sentences whose last cell it is
+        containing = [[] for _ in cells]
+        closing = [[] for _ in cells]
+        for s, positions in enumerate(members):
+            for p in positions:
+                containing[p].append(s)
+            closing[max(positions)].append(s)
+
+        # Sentences still open at each cell: with a cell at or after it
+        open_at = [[s for s, positions in enumerate(members) if max(positions) >= p]
+                   for p in range(len(cells))]
+
+        memo = {}
+
+        def count(p, residual):
+            """Configurations of cells p onwards, given the mines each
+            sentence still needs."""
+            if p == len(cells):
+                return {0: (1, [])}
+            key = (p, tuple(residual[s] for s in open_at[p]))
+            if key in memo:
+                return memo[key]
+
+            result = {}
+            for mine in (0, 1):
+                after = list(residual)
+                for s in containing[p]:
+                    after[s] -= mine
+                if any(after[s] != 0 for s in closing[p]) or any(after[s] < 0 for s in containing[p]):
+                    continue
+                for mines, (ways, per_cell) in count(p + 1, after).items():
+                    total, cell_ways = result.get(mines + mine, (0, [0] * (len(cells) - p)))
+                    cell_ways[0] += ways * mine
+                    for q, w in enumerate(per_cell, 1):
+                        cell_ways[q] += w
+                    result[mines + mine] = (total + ways, cell_ways)
 
-                        if len(new_set) and new_count == 1:
-                            self.mines = self.mines.union(new_set)
-                            continue
+            memo[key] = result
+            return result
 
-                        new_sentence = Sentence(new_set, new_count)
+        return cells, count(0, [sentence.count for sentence in sentences])
 
-                        if not new_sentence in self.knowledge:
-                            self.knowledge.append(new_sentence)
+    def probabilities(self):
+        """
+        Returns the probability of a mine in each frontier cell, by bit
+        number, and in any other unknown cell, over all placements of
+        the remaining mines consistent with the knowledge base. Returns
+        None, None if there are none.
+        """
+        components = {}
+        for sentences in self.frontier():
+            key = frozenset((sentence.mask, sentence.count) for sentence in sentences)
+            components[key] = self.components.get(key) or self.configurations(sentences)
+        self.components = components
+
+        remaining = self.mine_count - len(self.mines)
+        frontier = sum(len(cells) for cells, _ in components.values())
+        others = self.width * self.height - len(self.safes) - len(self.mines) - frontier
+
+        def convolve(distributions):
+            total = {0: 1}
+            for distribution in distributions:
+                combined = {}
+                for a, x in total.items():
+                    for b, (ways, _) in distribution.items():
+                        combined[a + b] = combined.get(a + b, 0) + x * ways
+                total = combined
+            return total
+
+        def placements(mines):
+            """Ways to place the mines left over among the other cells."""
+            left = remaining - mines
+            return math.comb(others, left) if 0 <= left <= others else 0
+
+        results = list(components.values())
+        total = sum(x * placements(mines) for mines, x in convolve([r for _, r in results]).items())
+        if total == 0:
+            return None, None
+
+        probability = {}
+        for c, (cells, result) in enumerate(results):
+            rest = convolve([r for d, (_, r) in enumerate(results) if d != c])
+            for mines, (_, cell_ways) in result.items():
+                weight = sum(x * placements(mines + other) for other, x in rest.items())
+                for k, ways in zip(cells, cell_ways):
+                    probability[k] = probability.get(k, 0) + ways * weight
+        probability = {k: ways / total for k, ways in probability.items()}
+
+        if others == 0:
+            return probability, None
+        expected = sum(x * placements(mines) * (remaining - mines)
+                       for mines, x in convolve([r for _, r in results]).items())
+        return probability, expected / total / others
 
     def make_safe_move(self):
         """
@@ -312,13 +588,14 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        possible_safes = self.safes - self.moves_made
+        while self.pending and self.pending[0] in self.moves_made:
+            self.pending.popleft()
+
+        if self.pending:
+            return self.pending[0]
 
-        if len(possible_safes) > 0:
-            return list(possible_safes)[0]
-        
         return None
-    
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
@@ -326,15 +603,23 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        if len(self.moves_made) == self.width * self.height - len(self.mines):
+        if not self.candidates:
             return None
 
-        i = random.randrange(0, self.width)
-        j = random.randrange(0, self.height)
-
-        while (i, j) in self.moves_made or (i, j) in self.mines:
-            i = random.randrange(0, self.width)
-            j = random.randrange(0, self.height)
+        # Guess the frontier cell least likely to be a mine, unless a
+        # cell away from the frontier is less likely still
+        frontier, other = self.probabilities()
+        frontier = frontier or {}
+        if frontier:
+            lowest = min(frontier.values())
+            if other is None or lowest <= other:
+                best = [k for k, p in frontier.items() if p == lowest]
+                return divmod(random.choice(best), self.width)
+
+        # There are candidates off the frontier whenever other is given
+        i, j = random.choice(self.candidates)
+        while i * self.width + j in frontier:
+            i, j = random.choice(self.candidates)
 
         return (i, j)
 
@@ -1,65 +1,125 @@
 import pygame
 import sys
-import time
 
-from minesweeper import Minesweeper, MinesweeperAI
+from minesweeper import Minesweeper
+from worker import AIWorker
 
+# Board size and mines, optionally given as python runner.py HEIGHT WIDTH MINES
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
+if len(sys.argv) == 4:
+    HEIGHT, WIDTH, MINES = (int(arg) for arg in sys.argv[1:])
+
+# Frames per second of the main loop
+FPS = 60
 
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
 WHITE = (255, 255, 255)
 
-# Create game
-pygame.init()
-size = width, height = 600, 400
-screen = pygame.display.set_mode(size)
-
-# Fonts
-OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
-smallFont = pygame.font.Font(OPEN_SANS, 20)
-mediumFont = pygame.font.Font(OPEN_SANS, 28)
-largeFont = pygame.font.Font(OPEN_SANS, 40)
-
-# Compute board size
-BOARD_PADDING = 20
-board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
-board_height = height - (BOARD_PADDING * 2)
-cell_size = int(min(board_width / WIDTH, board_height / HEIGHT))
-board_origin = (BOARD_PADDING, BOARD_PADDING)
 
-# Add images
-flag = pygame.image.load("assets/images/flag.png")
-flag = pygame.transform.scale(flag, (cell_size, cell_size))
-mine = pygame.image.load("assets/images/mine.png")
-mine = pygame.transform.scale(mine, (cell_size, cell_size))
+def main():
 
-# Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+    # Create game
+    pygame.init()
+    size = width, height = 600, 400
+    screen = pygame.display.set_mode(size)
+    clock = pygame.time.Clock()
 
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
-flags = set()
-lost = False
+    # Fonts
+    OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
+    smallFont = pygame.font.Font(OPEN_SANS, 20)
+    mediumFont = pygame.font.Font(OPEN_SANS, 28)
+    largeFont = pygame.font.Font(OPEN_SANS, 40)
 
-# Show instructions initially
-instructions = True
+    # Compute board size
+    BOARD_PADDING = 20
+    board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
+    board_height = height - (BOARD_PADDING * 2)
+    cell_size = max(1, int(min(board_width / WIDTH, board_height / HEIGHT)))
+    board_origin = (BOARD_PADDING, BOARD_PADDING)
+    border = min(3, max(1, cell_size // 8))
 
-while True:
+    # Add images
+    flag = pygame.image.load("assets/images/flag.png")
+    flag = pygame.transform.scale(flag, (cell_size, cell_size))
+    mine = pygame.image.load("assets/images/mine.png")
+    mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
-    # Check if game quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
+    # Rendered numbers, so each is only rendered once
+    numbers = [smallFont.render(str(n), True, BLACK) for n in range(9)]
 
-    screen.fill(BLACK)
+    # Buttons and status text
+    aiButton = pygame.Rect(
+        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+        (width / 3) - BOARD_PADDING * 2, 50
+    )
+    resetButton = pygame.Rect(
+        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+        (width / 3) - BOARD_PADDING * 2, 50
+    )
+    textArea = pygame.Rect((2 / 3) * width, (2 / 3) * height - 25, width / 3, 50)
+
+    def cell_rect(cell):
+        i, j = cell
+        return pygame.Rect(
+            board_origin[0] + j * cell_size,
+            board_origin[1] + i * cell_size,
+            cell_size, cell_size
+        )
+
+    def cell_at(position):
+        """
+        Returns the board cell at a window position, or None.
+        """
+        j = (position[0] - board_origin[0]) // cell_size
+        i = (position[1] - board_origin[1]) // cell_size
+        if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+            return (i, j)
+        return None
+
+    def draw_cell(cell):
+        """
+        Draws one cell and returns its rectangle.
+        """
+        rect = cell_rect(cell)
+        pygame.draw.rect(screen, GRAY, rect)
+        pygame.draw.rect(screen, WHITE, rect, border)
+
+        # Add a mine, flag, or number if needed
+        if game.is_mine(cell) and lost:
+            screen.blit(mine, rect)
+        elif cell in flags:
+            screen.blit(flag, rect)
+        elif cell in revealed:
+            neighbors = numbers[game.nearby_mines(cell)]
+            neighborsTextRect = neighbors.get_rect()
+            neighborsTextRect.center = rect.center
+            screen.blit(neighbors, neighborsTextRect)
+        return rect
+
+    def draw_button(rect, label):
+        buttonText = mediumFont.render(label, True, BLACK)
+        buttonRect = buttonText.get_rect()
+        buttonRect.center = rect.center
+        pygame.draw.rect(screen, WHITE, rect)
+        screen.blit(buttonText, buttonRect)
+
+    def draw_board():
+        """
+        Draws the whole game screen.
+        """
+        screen.fill(BLACK)
+        for i in range(HEIGHT):
+            for j in range(WIDTH):
+                draw_cell((i, j))
+        draw_button(aiButton, "AI Move")
+        draw_button(resetButton, "Reset")
 
-    # Show game instructions
-    if instructions:
+    def draw_instructions():
+        screen.fill(BLACK)
 
         # Title
         title = largeFont.render("Play Minesweeper", True, WHITE)
@@ -80,143 +140,135 @@ while True:
             screen.blit(line, lineRect)
 
         # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
-
-        # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
-                instructions = False
-                time.sleep(0.3)
-
-        pygame.display.flip()
-        continue
-
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
+        draw_button(playButton, "Play Game")
+
+    def draw_text(text):
+        pygame.draw.rect(screen, BLACK, textArea)
+        text = mediumFont.render(text, True, WHITE)
+        textRect = text.get_rect()
+        textRect.center = textArea.center
+        screen.blit(text, textRect)
+        return textArea
+
+    playButton = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+
+    # Create game and AI agent
+    game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+    ai = AIWorker(height=HEIGHT, width=WIDTH, mines=MINES)
+
+    # Keep track of revealed cells, flagged cells, and if a mine was hit
+    revealed = set()
+    flags = set()
+    lost = False
+
+    # Show instructions initially
+    instructions = True
+    draw_instructions()
+    pygame.display.flip()
 
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
-
-    move = None
-
-    left, _, right = pygame.mouse.get_pressed()
-
-    # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
-
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
-            time.sleep(0.2)
-
-        # Reset game state
-        elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
+    # Cells to redraw this frame, and the status text last drawn
+    dirty = set()
+    shown_text = None
+
+    while True:
+
+        move = None
+        clicks = []
+
+        # Check if game quit
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                ai.close()
+                sys.exit()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                clicks.append(event)
+
+        # Show game instructions
+        if instructions:
+            if any(click.button == 1 and playButton.collidepoint(click.pos) for click in clicks):
+                instructions = False
+                draw_board()
+                pygame.display.flip()
+            clock.tick(FPS)
             continue
 
-        # User-made move
-        elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
+        for click in clicks:
+            cell = cell_at(click.pos)
+
+            # Right-click to toggle flagging
+            if click.button == 3 and not lost:
+                if cell is not None and cell not in revealed:
+                    flags.symmetric_difference_update({cell})
+                    dirty.add(cell)
+
+            elif click.button == 1:
+
+                # If AI button clicked, ask the AI for a move
+                if aiButton.collidepoint(click.pos) and not lost:
+                    ai.request_move()
+
+                # Reset game state
+                elif resetButton.collidepoint(click.pos):
+                    ai.close()
+                    game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+                    ai = AIWorker(height=HEIGHT, width=WIDTH, mines=MINES)
+                    revealed = set()
+                    flags = set()
+                    lost = False
+                    dirty = set()
+                    shown_text = None
+                    draw_board()
+                    pygame.display.flip()
+
+                # User-made move
+                elif not lost and cell is not None and cell not in flags and cell not in revealed:
+                    move = cell
+
+        # Check for an AI move
+        answer = ai.poll()
+        if answer is not None and not lost:
+            ai_move, safe, mines = answer
+            if ai_move is None:
+                dirty |= flags ^ mines
+                flags = mines
+                print("No moves left to make.")
+            elif safe:
+                print("AI making safe move.")
+                move = ai_move
+            else:
+                print("No known safe moves, AI making random move.")
+                move = ai_move
+
+        # Make move and update AI knowledge
+        if move and move not in revealed:
+            if game.is_mine(move):
+                lost = True
+                dirty |= game.mines
+            else:
+                revealed.add(move)
+                dirty.add(move)
+                ai.add_knowledge(move, game.nearby_mines(move))
+
+        # Redraw only what changed
+        updated = [draw_cell(cell) for cell in dirty]
+        dirty.clear()
+
+        if lost:
+            text = "Lost"
+        elif game.mines == flags:
+            text = "Won"
+        elif ai.error is not None:
+            text = "AI failed"
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            text = "Thinking..." if ai.waiting else ""
+        if text != shown_text:
+            updated.append(draw_text(text))
+            shown_text = text
 
-    pygame.display.flip()
+        if updated:
+            pygame.display.update(updated)
+        clock.tick(FPS)
+
+
+if __name__ == "__main__":
+    main()
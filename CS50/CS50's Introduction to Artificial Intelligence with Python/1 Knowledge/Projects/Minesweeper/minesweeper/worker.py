@@ -0,0 +1,117 @@
+"""
+Background AI for the Minesweeper runner
+"""
+
+import multiprocessing
+
+from minesweeper import MinesweeperAI
+
+
+def serve(conn, height, width, mines):
+    """
+    Owns a MinesweeperAI and handles requests from conn in order until it
+    receives None: ("add", cell, count) adds knowledge, ("move",) sends
+    back the AI's move, whether it is known to be safe, and, only once no
+    move is left, the cells it knows to be mines (None otherwise, so a
+    move does not cost a copy of every known mine).
+    """
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+
+        if request[0] == "add":
+            ai.add_knowledge(request[1], request[2])
+        elif request[0] == "move":
+            move = ai.make_safe_move()
+            safe = move is not None
+            if move is None:
+                move = ai.make_random_move()
+            conn.send((move, safe, set(ai.mines) if move is None else None))
+
+    conn.close()
+
+
+class AIWorker():
+    """
+    Runs a MinesweeperAI in a separate process, so inference on a large
+    board does not stall the window. Knowledge is sent without waiting;
+    a move request is answered after all knowledge sent before it. If
+    the AI process dies, error says so and the worker ignores further
+    requests.
+    """
+
+    def __init__(self, height, width, mines):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=serve, args=(child_conn, height, width, mines), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        # True from request_move() until poll() returns the answer
+        self.waiting = False
+
+        # Why the AI process stopped answering, None while it works
+        self.error = None
+
+    def add_knowledge(self, cell, count):
+        """
+        Tells the AI how many mines are around a revealed safe cell.
+        """
+        self.send(("add", cell, count))
+
+    def request_move(self):
+        """
+        Asks the AI for its next move, unless a request is pending.
+        """
+        if not self.waiting and self.error is None:
+            self.waiting = self.send(("move",))
+
+    def poll(self):
+        """
+        Returns the answer to the move request, a tuple of the move (None
+        if no move is left), whether it is known to be safe and the known
+        mines (None unless no move is left), once it is ready, and None
+        otherwise.
+        """
+        if not self.waiting or not self.conn.poll():
+            return None
+
+        self.waiting = False
+        try:
+            return self.conn.recv()
+        except EOFError:
+            self.error = f"AI process exited with code {self.process.exitcode}"
+            return None
+
+    def send(self, request):
+        """
+        Sends a request to the AI process. Returns False, and records the
+        error, if the process is gone.
+        """
+        if self.error is not None:
+            return False
+        try:
+            self.conn.send(request)
+            return True
+        except (BrokenPipeError, OSError):
+            self.process.join(timeout=1)
+            self.error = f"AI process exited with code {self.process.exitcode}"
+            return False
+
+    def close(self):
+        """
+        Stops the AI process.
+        """
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
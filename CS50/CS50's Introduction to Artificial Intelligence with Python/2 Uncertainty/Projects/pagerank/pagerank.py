@@ -1,12 +1,40 @@
+import hashlib
+import json
 import os
 import random
 import re
 import sys
-import copy
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Largest L1 change between iterations at which iterate_pagerank stops
+TOLERANCE = 0.001
+
+# Directory of the user's cache in which crawl by default caches, per
+# corpus, the links of each file and the link graph
+CACHE_HOME = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "pagerank"
+)
+
+# Fewest files to parse before crawl parses them in a pool of processes
+PARALLEL_FILES = 64
+
+# Links in an HTML page
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Most random surfers sample_pagerank walks at once
+WALKERS = 100000
+
+# Steps each surfer walks before its pages are counted, so the start
+# page no longer matters (its weight is below DAMPING ** BURN_IN)
+BURN_IN = 50
+
 
 def main():
     if len(sys.argv) != 2:
@@ -22,33 +50,159 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, processes=None, cache_directory=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
+    The links of every file are cached in `cache_directory`, by default
+    the corpus's directory in CACHE_HOME (see `default_cache_directory`),
+    by size and modification time, so only new or changed files are
+    parsed again, in a pool of `processes` processes if there are many.
+    The resulting link graph is written there as an edge list, see
+    `write_edges`, and read back instead of being rebuilt if no file
+    changed. Nothing is written into the corpus itself.
+    """
+    if cache_directory is None:
+        cache_directory = default_cache_directory(directory)
+    cache = read_link_cache(cache_directory)
+
+    # Size, modification time and, if unchanged, cached links of each file
+    files = dict()
+    stale = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        stat = entry.stat()
+        key = [stat.st_size, stat.st_mtime_ns]
+        cached = cache.get(entry.name)
+        if cached is not None and cached[:2] == key:
+            files[entry.name] = cached
+        else:
+            files[entry.name] = key + [None]
+            stale.append(entry.name)
+
+    # Nothing changed: load the link graph written by the last crawl
+    edges = os.path.join(cache_directory, "edges.npz")
+    if not stale and files.keys() == cache.keys():
+        try:
+            pages = read_edges(edges)
+            if pages.keys() == files.keys():
+                return pages
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+
+    # Extract all links from new or changed HTML files
+    paths = [os.path.join(directory, filename) for filename in stale]
+    if len(paths) >= PARALLEL_FILES and (processes or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(processes) as pool:
+            parsed = list(pool.map(parse_links, paths, chunksize=PARALLEL_FILES))
+    else:
+        parsed = [parse_links(path) for path in paths]
+    for filename, links in zip(stale, parsed):
+        files[filename][2] = links
 
     # Only include links to other pages in the corpus
-    for filename in pages:
+    pages = dict()
+    for filename in files:
         pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
+            link for link in files[filename][2]
+            if link in files and link != filename
         )
 
+    # The edge list is written first, so the cache never marks files as
+    # unchanged while the edge list on disk is older than them
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        write_edges(edges, pages)
+        if stale or files.keys() != cache.keys():
+            write_link_cache(cache_directory, files)
+    except OSError:
+        pass
+
     return pages
 
 
+def default_cache_directory(directory):
+    """
+    Return the directory in CACHE_HOME for the cache of a corpus, named
+    after a hash of its real path so that every corpus has its own.
+    """
+    path = os.path.realpath(directory).encode(errors="surrogateescape")
+    return os.path.join(CACHE_HOME, hashlib.sha256(path).hexdigest()[:16])
+
+
+def parse_links(path):
+    """
+    Return the sorted list of distinct links in an HTML file.
+    """
+    with open(path) as f:
+        return sorted(set(LINK.findall(f.read())))
+
+
+def read_link_cache(cache_directory):
+    """
+    Return the cached [size, mtime, links] of each file, or an empty
+    dictionary if there is no readable cache.
+    """
+    try:
+        with open(os.path.join(cache_directory, "links.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def write_link_cache(cache_directory, files):
+    """
+    Write the [size, mtime, links] of each file to the cache, replacing
+    the old cache only once the new one is complete.
+    """
+    path = os.path.join(cache_directory, "links.json")
+    with open(path + ".tmp", "w") as f:
+        f.write(json.dumps(files, separators=(",", ":")))
+    os.replace(path + ".tmp", path)
+
+
+def write_edges(path, corpus):
+    """
+    Write a corpus as an edge list: a NumPy .npz file of the page names,
+    sorted, and of the indices of the linking and the linked page of
+    every link, as 32-bit integers.
+    """
+    pages = sorted(corpus)
+    index = {page: k for k, page in enumerate(pages)}
+    counts = np.fromiter((len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages))
+    sources = np.repeat(np.arange(len(pages), dtype=np.int32), counts)
+    targets = np.fromiter(
+        (index[link] for page in pages for link in corpus[page]),
+        dtype=np.int32, count=int(counts.sum())
+    )
+
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, pages=np.array(pages, dtype=str), sources=sources, targets=targets)
+    os.replace(path + ".tmp", path)
+
+
+def read_edges(path):
+    """
+    Return the corpus stored in an edge list written by `write_edges`.
+    """
+    with np.load(path) as edges:
+        pages = edges["pages"].tolist()
+        sources = edges["sources"]
+        targets = edges["targets"].tolist()
+
+    # Sources are in page order, so the links of each page are contiguous
+    ends = np.cumsum(np.bincount(sources, minlength=len(pages))).tolist()
+    corpus = dict()
+    start = 0
+    for page, end in zip(pages, ends):
+        corpus[page] = set(pages[j] for j in targets[start:end])
+        start = end
+    return corpus
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -78,7 +232,7 @@ def transition_model(corpus, page, damping_factor):
     return probabilites
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -86,27 +240,67 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-    """
 
-    distribution = dict()
-    
-    # Setting sample count / probability distribution
-    for p in corpus.keys():
-        distribution[p] = 0
-
-    # Starting sample
-    sample = random.choice(list(corpus.keys()))
-
-    for i in range(n):
-        distribution[sample] += 1
-        tm = transition_model(corpus, sample, damping_factor)
+    The samples are taken by up to WALKERS independent surfers moving
+    in step, with NumPy. `seed` seeds the generator; without it, it is
+    seeded from `random`, so `random.seed` makes results repeatable.
+    """
+    pages, sources, targets, counts = link_arrays(corpus)
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+    # Links of page p are targets[starts[p]:starts[p] + counts[p]]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    walkers = min(WALKERS, n)
+    current = rng.integers(len(pages), size=walkers)
+    visits = np.zeros(len(pages), dtype=np.int64)
+
+    # Pages visited but not yet counted, counted in batches as large as
+    # the corpus, so counting costs O(1) per sample
+    pending = []
+    pending_size = 0
+
+    for step in range(BURN_IN + -(-n // walkers)):
+        if step >= BURN_IN:
+            taken = min(walkers, n - (step - BURN_IN) * walkers)
+            pending.append(current[:taken])
+            pending_size += taken
+            if pending_size >= len(pages):
+                visits += np.bincount(np.concatenate(pending), minlength=len(pages))
+                pending = []
+                pending_size = 0
+
+        # Follow a random link with probability damping_factor, and
+        # otherwise, or from a page with no links, go to a random page
+        links = counts[current]
+        follow = (rng.random(walkers) < damping_factor) & (links > 0)
+        choice = starts[current] + (rng.random(walkers) * links).astype(np.int64)
+        current = rng.integers(len(pages), size=walkers)
+        current[follow] = targets[choice[follow]]
+
+    if pending:
+        visits += np.bincount(np.concatenate(pending), minlength=len(pages))
+
+    return dict(zip(pages, (visits / n).tolist()))
+
+
+def link_arrays(corpus):
+    """
+    Return the list of pages of the corpus, and NumPy arrays of the index
+    of the linking page and of the linked page for every link, sorted by
+    linking page, and of the number of links on every page.
+    """
+    pages = list(corpus)
+    index = {page: k for k, page in enumerate(pages)}
 
-        sample = random.choices(list(tm.keys()), list(tm.values()))[0]
-    
-    for p in corpus.keys():
-        distribution[p] /= n
+    counts = np.fromiter((len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages))
+    sources = np.repeat(np.arange(len(pages)), counts)
+    targets = np.fromiter(
+        (index[link] for page in pages for link in corpus[page]),
+        dtype=np.int64, count=int(counts.sum())
+    )
 
-    return distribution
+    return pages, sources, targets, counts
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -118,55 +312,29 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    pages, sources, targets, counts = link_arrays(corpus)
+    n = len(pages)
+
+    # The link matrix, column-stochastic and scaled by the damping factor,
+    # as one weight per link; multiplying a distribution by it is a
+    # weighted bincount over the linked pages
+    weights = damping_factor / counts[sources]
+
+    # Pages with no links are read as linking to every page, so their
+    # probability is spread evenly and only its total is needed
+    dangling = counts == 0
+
+    distribution = np.full(n, 1 / n)
+    while True:
+        new_distribution = np.bincount(targets, weights=weights * distribution[sources], minlength=n)
+        new_distribution += ((1 - damping_factor) + damping_factor * distribution[dangling].sum()) / n
+
+        converged = np.abs(new_distribution - distribution).sum() < TOLERANCE
+        distribution = new_distribution
+        if converged:
+            break
 
-    distribution = dict()
-    new_distribution = dict()
-    emptyPages = set()
-
-    converged = False
-    # Accuracy for the convergence
-    eps = 0.001
-
-    # Setting initial values
-    for page in corpus.keys():
-        distribution[page] = 1 / len(corpus)
-        new_distribution[page] = 1 / len(corpus)
-
-    # Getting pages that link to each one
-    pageLinks = dict()
-    for page in corpus.keys():
-        pageLinks[page] = set()
-
-        if len(corpus[page]) == 0:
-            emptyPages.add(page)
-
-        for i in corpus.keys():
-            if page in corpus[i]:
-                pageLinks[page].add(i)
-
-    # Iterative formula
-    while not converged:
-        for p in corpus.keys():
-            sigma = 0
-            for i in pageLinks[p]:
-                if len(corpus[i]) != 0:
-                    sigma += distribution[i] / len(corpus[i])
-            
-            # Handling pages with no links by adding it's probability divided by length of the corpus
-            for i in emptyPages:
-                sigma += distribution[i] / len(corpus)
-            
-            new_distribution[p] = (1 - damping_factor) / len(corpus) + damping_factor * sigma
-
-        # Checking for difference between new values and old values to see if they are converged
-        for p in corpus.keys():
-            if abs(new_distribution[page] - distribution[page]) < eps:
-                converged = True
-            else:
-                converged = False
-        distribution = copy.deepcopy(new_distribution)
-    
-    return distribution
+    return dict(zip(pages, distribution.tolist()))
 
 
 if __name__ == "__main__":